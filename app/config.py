@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -21,8 +23,23 @@ class Settings(BaseSettings, extra="allow"):
     MEILI_URL: str = "http://localhost:7700"
     MEILI_API_KEY: str = "your-meili-api-key"
     MEILI_INDEX: str = "your-meili-index"
+    # 搜索后端：meilisearch（不可用时降级到进程内索引）或 local（只使用进程内索引）
+    SEARCH_BACKEND: Literal["meilisearch", "local"] = "meilisearch"
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    # 服务器目录导出接口的独立限流额度（每个用户或 IP）
+    EXPORT_RATE_LIMIT: int = 10
+    EXPORT_RATE_WINDOW: int = 3600
+    # 各路由的 Cache-Control 策略，登录用户的响应会将 public 替换为 private
+    CACHE_CONTROL: dict[str, str] = {
+        "servers": "public, max-age=0, must-revalidate",
+        "server_info": "public, max-age=0, must-revalidate",
+        "servers_batch": "public, max-age=0, must-revalidate",
+        "server_gallery": "public, max-age=0, must-revalidate",
+        "server_badge": "public, max-age=60, s-maxage=60, stale-while-revalidate=300",
+        "server_icon": "public, max-age=31536000, immutable",
+        "server_icon_latest": "public, max-age=300",
+    }
 
     class Config:
         env_file = ".env"
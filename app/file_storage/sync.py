@@ -6,10 +6,14 @@ from app.log import logger
 from app.models import File
 
 
+# 由 File 表管理的对象目录，其他目录（如服务器图标）由各自的模块维护
+UPLOADS_PREFIX = "uploads/"
+
+
 async def _list_bucket_keys() -> list[str]:
     async with session.resource("s3", endpoint_url=settings.S3_ENDPOINT_URL) as s3:
         bucket = await s3.Bucket(settings.S3_BUCKET)
-        return [obj.key async for obj in bucket.objects.all()]
+        return [obj.key async for obj in bucket.objects.filter(Prefix=UPLOADS_PREFIX)]
 
 
 async def sync_bucket_with_db() -> None:
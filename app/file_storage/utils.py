@@ -1,3 +1,4 @@
+import time
 import uuid
 
 from app.config import settings
@@ -43,3 +44,43 @@ async def upload_file_to_s3(file_content: bytes, file_name: str) -> tuple[str, F
         f"{settings.S3_ENDPOINT_URL}/{settings.S3_BUCKET}/{s3_object_name}",
         file_object,
     )
+
+
+def get_object_url(key: str) -> str:
+    return f"{settings.S3_ENDPOINT_URL}/{settings.S3_BUCKET}/{key}"
+
+
+async def put_public_object(
+    key: str,
+    body: bytes,
+    content_type: str,
+    cache_control: str,
+    content_encoding: str | None = None,
+) -> str:
+    """上传不由 File 表管理的对象（不能放在 uploads/ 下），返回对象地址"""
+    extra = {"ContentEncoding": content_encoding} if content_encoding else {}
+    async with session.resource("s3", endpoint_url=settings.S3_ENDPOINT_URL) as s3:
+        bucket = await s3.Bucket(settings.S3_BUCKET)
+        await bucket.put_object(
+            Key=key,
+            Body=body,
+            ContentType=content_type,
+            CacheControl=cache_control,
+            **extra,
+        )
+    return get_object_url(key)
+
+
+async def delete_stale_objects(prefix: str, keep: set[str], max_age: int) -> int:
+    """删除 prefix 下超过 max_age 秒且不在 keep 中的对象，返回删除数量"""
+    deadline = time.time() - max_age
+    deleted = 0
+    async with session.resource("s3", endpoint_url=settings.S3_ENDPOINT_URL) as s3:
+        bucket = await s3.Bucket(settings.S3_BUCKET)
+        async for obj in bucket.objects.filter(Prefix=prefix):
+            if obj.key in keep:
+                continue
+            if (await obj.last_modified).timestamp() < deadline:
+                await obj.delete()
+                deleted += 1
+    return deleted
@@ -2,11 +2,13 @@
 from .file import File
 from .server import (
     AuthModeEnum,
+    DeletedServer,
     Gallery,
     GalleryImage,
     Server,
     ServerLog,
     ServerStatus,
+    ServerTag,
     ServerTypeEnum,
 )
 from .ticket import Ticket, TicketLog, TicketPriority, TicketStatus, TicketType
@@ -16,6 +18,7 @@ __all__ = [
     "AuthModeEnum",
     "BanRecord",
     "BanTypeEnum",
+    "DeletedServer",
     "File",
     "Gallery",
     "GalleryImage",
@@ -24,6 +27,7 @@ __all__ = [
     "Server",
     "ServerLog",
     "ServerStatus",
+    "ServerTag",
     "ServerTypeEnum",
     "Ticket",
     "TicketLog",
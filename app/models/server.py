@@ -5,6 +5,7 @@ from tortoise import Model, fields
 from tortoise.fields.base import Field
 
 from app.services.conn.db import add_model
+from app.services.servers.cache import bump_server_version
 
 if TYPE_CHECKING:
     from app.models.file import File
@@ -58,12 +59,14 @@ class Server(Model):
         on_delete=fields.CASCADE,  # 级联删除
         null=True,
     )
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
 
     async def save_with_user(self, user: "User") -> None:
         """
         保存模型并记录变更日志（仅在更新时有变更才生成日志）。
         """
         changed_fields: dict[str, Any] = {}
+        is_new = not self.id
 
         # 只有已有 ID（即更新操作）时，才计算变更
         if self.id:
@@ -85,6 +88,10 @@ class Server(Model):
                 server=self, user=user, changed_fields=changed_fields
             )
 
+        # 新建或有变更时使缓存失效
+        if changed_fields or is_new:
+            await bump_server_version(self.id)
+
     class Meta:
         table = "server"
 
@@ -107,6 +114,7 @@ class GalleryImage(Model):
 class ServerStatus(Model):
     server = fields.ForeignKeyField("default.Server", related_name="stats")
     timestamp = fields.DatetimeField(auto_now_add=True)
+    updated_at = fields.DatetimeField(auto_now=True, index=True)
     stat_data: Field[dict | None] = fields.JSONField(
         default=dict, null=True
     )  # 用于存储查询结果
@@ -115,6 +123,31 @@ class ServerStatus(Model):
         table = "server_stats"
 
 
+class ServerTag(Model):
+    """服务器标签倒排索引，与 Server.tags 保持同步"""
+
+    id = fields.IntField(pk=True, generated=True)
+    server: fields.ForeignKeyRelation["Server"] = fields.ForeignKeyField(
+        "default.Server", related_name="tag_index", on_delete=fields.CASCADE
+    )
+    # MySQL 中使用二进制排序规则（见迁移），与 Server.tags 一样区分大小写
+    tag = fields.CharField(max_length=32, index=True)
+
+    class Meta:
+        table = "server_tag"
+        unique_together = (("tag", "server"),)
+
+
+class DeletedServer(Model):
+    """已删除服务器的记录，供增量导出输出删除标记"""
+
+    server_id = fields.IntField(pk=True, generated=False)
+    deleted_at = fields.DatetimeField(auto_now_add=True, index=True)
+
+    class Meta:
+        table = "server_deleted"
+
+
 class ServerLog(Model):
     id = fields.IntField(pk=True, generated=True)
     server: fields.ForeignKeyRelation["Server"] = fields.ForeignKeyField(
@@ -1,9 +1,20 @@
-from typing import Any
+import time
+from typing import Literal
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query, Request
 
-from app.config import settings
-from app.services.conn.meilisearch import client
+from app.services.auth.schemas import JWTData
+from app.services.rate_limit import client_key
+from app.services.search.analytics import (
+    RETENTION_DAYS,
+    GetSearchAnalytics,
+    record_search,
+)
+from app.services.search.cache import normalize_query
+from app.services.search.crud import SearchServers, SearchServersMulti
+from app.services.search.schemas import MultiSearchRequest, SearchAnalytics
+from app.services.user.crud import get_current_user
+from app.services.search.suggest import SuggestServers
 
 router = APIRouter()
 
@@ -13,7 +24,7 @@ router = APIRouter()
     tags=["search"],
     responses={
         200: {
-            "description": "搜索成功",
+            "description": "搜索成功，cover_url 和 status 仅在 with_status=true 时返回，离线时 status 为 null",
             "content": {
                 "application/json": {
                     "example": {
@@ -26,21 +37,169 @@ router = APIRouter()
                                 "type": "BEDROCK",
                                 "is_member": True,
                                 "tags": ["生存", "建筑"],
+                                "cover_url": "https://example.com/cover.webp",
+                                "status": {
+                                    "players": {"online": 12, "max": 100},
+                                    "delay": 35.2,
+                                    "version": "1.21.4",
+                                    "motd": {
+                                        "plain": "欢迎",
+                                        "html": "<p>欢迎</p>",
+                                        "minecraft": "§a欢迎",
+                                        "ansi": "\u001b[92m欢迎\u001b[0m",
+                                    },
+                                    "icon": "/v1/servers/2/icon.png?hash=3f2a…",
+                                    "icon_hash": "3f2a…",
+                                },
                             }
                         ]
                     }
                 }
             },
-        }
+        },
+        400: {"description": "筛选条件无效"},
+        503: {"description": "搜索服务暂不可用"},
     },
 )
 async def search_servers(
+    request: Request,
     query: str = Query(..., description="搜索关键词"),
-    limit: int = Query(10, description="返回条数"),
+    limit: int = Query(10, ge=1, le=100, description="返回条数"),
     filters: str = Query(None, description="筛选条件，例如 'is_member=true'"),
+    with_status: bool = Query(
+        False, description="是否为每个结果附带封面和最新状态（在线人数、延迟等）"
+    ),
+    sort: Literal["players", "uptime"] | None = Query(
+        None,
+        description="排序方式：players 在线人数多的在前，uptime 持续在线时间长的在前，默认按相关性",
+    ),
+):
+    started = time.perf_counter()
+    results = await SearchServers(query, limit, filters, with_status, sort)
+    record_search(
+        normalize_query(query),
+        len(results),
+        time.perf_counter() - started,
+        client_key(request, getattr(request.state, "user", None)),
+    )
+    return {"results": results}
+
+
+@router.post(
+    "/search/multi",
+    tags=["search"],
+    summary="多重搜索",
+    responses={
+        200: {
+            "description": "搜索成功，results 与请求中 queries 的顺序一致",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "results": [
+                            [{"id": 2, "name": "成员服务器", "is_member": True}],
+                            [{"id": 5, "name": "Java 服务器", "type": "JAVA"}],
+                        ]
+                    }
+                }
+            },
+        },
+        400: {"description": "筛选条件无效"},
+        503: {"description": "搜索服务暂不可用"},
+    },
+)
+async def multi_search(body: MultiSearchRequest):
+    """
+    一次执行多个搜索，例如首页的成员服务器、Java 和基岩版区块。
+
+    每个子查询有各自的条数、筛选条件和缓存，未命中缓存的子查询通过 Meilisearch 多重搜索接口一次请求。
+    """
+    return {"results": await SearchServersMulti(body.queries, body.with_status)}
+
+
+@router.get(
+    "/search/suggest",
+    tags=["search"],
+    summary="搜索联想",
+    responses={
+        200: {
+            "description": "联想成功",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "suggestions": [
+                            {"text": "生存", "type": "tag", "id": None},
+                            {"text": "生存服务器", "type": "server", "id": 2},
+                        ]
+                    }
+                }
+            },
+        }
+    },
+)
+async def suggest(
+    q: str = Query(..., description="已输入的前缀"),
+    limit: int = Query(8, ge=1, le=20, description="返回条数"),
+):
+    """
+    按前缀返回服务器名称和标签的联想词，按在线人数和标签使用次数排序。
+
+    只使用进程内索引，不请求 Meilisearch。
+    """
+    return {"suggestions": await SuggestServers(q, limit)}
+
+
+@router.get(
+    "/search/analytics",
+    tags=["search"],
+    response_model=SearchAnalytics,
+    summary="搜索统计",
+    responses={
+        200: {
+            "description": "成功获取搜索统计",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "days": 7,
+                        "total": 1520,
+                        "unique_users": 311,
+                        "latency_histogram": {
+                            "<=5ms": 1200,
+                            "<=25ms": 280,
+                            "<=100ms": 40,
+                        },
+                        "top_queries": [
+                            {
+                                "query": "生存",
+                                "count": 230,
+                                "zero_results": 0,
+                                "avg_latency_ms": 3.1,
+                                "unique_users": 120,
+                            }
+                        ],
+                        "top_zero_results": [
+                            {
+                                "query": "起床战争",
+                                "count": 18,
+                                "zero_results": 18,
+                                "avg_latency_ms": 9.4,
+                                "unique_users": 11,
+                            }
+                        ],
+                    }
+                }
+            },
+        },
+        403: {"description": "只有管理员可以查看搜索统计"},
+    },
+)
+async def search_analytics(
+    days: int = Query(7, ge=1, le=RETENTION_DAYS, description="统计最近几天"),
+    limit: int = Query(50, ge=1, le=500, description="返回的搜索词数量"),
+    current_user: JWTData = Depends(get_current_user),
 ):
-    params: dict[str, Any] = {"limit": limit}
-    if filters:
-        params["filter"] = filters
-    results = client.index(settings.MEILI_INDEX).search(query, params)
-    return {"results": results.get("hits", [])}
+    """
+    查看最近几天的热门搜索词、无结果搜索词、耗时分布和独立用户数，仅全局管理员可用。
+
+    统计由各 worker 汇总后定期写入，最多延迟数十秒；负载高时抽样记录，次数为估算值。
+    """
+    return await GetSearchAnalytics(current_user, days, limit)
@@ -1,4 +1,8 @@
-from typing import Annotated
+import asyncio
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from datetime import datetime
+from typing import Annotated, Literal
 
 from fastapi import (
     APIRouter,
@@ -6,35 +10,85 @@ from fastapi import (
     Form,
     HTTPException,
     Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
     status,
 )
+from fastapi.responses import StreamingResponse
+from tortoise import timezone
 
+from app.config import settings
+from app.log import logger
 from app.services.auth.schemas import JWTData
+from app.services.http_cache import (
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from app.services.rate_limit import rate_limit
+from app.services.response_cache import (
+    cache_response,
+    compressed_response,
+    get_cached_response,
+)
+from app.services.servers.badge import get_badge, get_badge_fingerprint
+from app.services.servers.cache import (
+    get_catalogue_version,
+    get_server_token,
+    get_server_tokens,
+    is_valid_token,
+)
+from app.services.servers.fragments import dumps, parse_projection
+from app.services.servers.icons import get_current_icon_hash, get_icon
+from app.services.servers.live import (
+    MAX_CONNECTIONS,
+    connection_count,
+    stream_updates,
+)
 from app.services.servers.crud import (
     AddGalleryImage,
+    ExportServers,
     GetAllPlayersNum,
     GetGallerylist,
     GetServer_by_id,
     GetServer_by_id_editor,
+    GetServerChanges,
+    GetServerIds,
     GetServerOwners_by_id,
     GetServers,
+    GetServerFacets,
+    GetServers_by_ids,
+    GetTagFacets,
     RemoveGalleryImage,
     update_server_by_id,
 )
 from app.services.servers.schemas import (
     GallerySchema,
     GetServerManagers,
+    ServerBatch,
+    ServerChanges,
     ServerDetail,
+    ServerFacets,
     ServerFilter,
     ServerGallery,
     ServerList,
+    ServerTagFacets,
     ServerTotalPlayers,
     UpdateServerRequest,
 )
 from app.services.user.crud import get_optional_user
+from app.services.user.permissions import get_user_permissions
 
 router = APIRouter()
 
+# 批量接口单次最多查询的服务器数量
+MAX_BATCH_IDS = 50
+# 推送接口单个连接最多订阅的服务器数量
+MAX_LIVE_IDS = 200
+
 
 # 获取服务器列表
 @router.get(
@@ -71,6 +125,7 @@ router = APIRouter()
                                         "ansi": "\u001b[0m 服务器名称 2\u001b[0m",
                                     },
                                     "icon": None,
+                                    "icon_hash": None,
                                 },
                                 "permission": "owner",
                                 "cover_url": "/static/cover.png",
@@ -79,6 +134,7 @@ router = APIRouter()
                         "total_member": 1,
                         "total": 1,
                         "random_seed": 123456,
+                        "next_cursor": "eyJzIjoiZGVmYXVsdCIsInNlZWQiOjEyMzQ1NiwicG9zIjo1fQ",
                     }
                 }
             },
@@ -92,15 +148,33 @@ router = APIRouter()
     },
 )
 async def list_servers(
+    request: Request,
     user: JWTData | None = Depends(get_optional_user),
     is_member: bool = Query(True, description="是否为成员服务器"),
     modes: str | None = Query(None, description="服务器类型"),
     authModes: list[str] = Query(["OFFLINE", "YGGDRASIL", "OFFICIAL"]),
     tags: list[str] = Query(None),
+    tag_mode: Literal["all", "any"] = Query(
+        "all", description="标签匹配模式：all 包含全部标签，any 包含任一标签"
+    ),
     limit: int = Query(5, ge=1),
     offset: int = Query(0, ge=0),
     random: bool = Query(True),
     seed: int | None = Query(None, ge=0),
+    sort: Literal["default", "name", "players", "latency", "uptime", "newest"] = Query(
+        "default",
+        description=(
+            "排序方式：default 随机（或按 ID）且在线优先，name 按名称，"
+            "players 在线人数，latency 延迟，uptime 持续在线时长，newest 最新收录"
+        ),
+    ),
+    cursor: str | None = Query(
+        None, description="上一页返回的 next_cursor，传入时忽略 offset 和 seed"
+    ),
+    fields: str | None = Query(
+        None, description="返回字段，逗号分隔，例如 name,status.players"
+    ),
+    view: Literal["lite", "full"] = Query("full", description="预设字段视图"),
 ):
     """
     获取服务器列表。
@@ -110,20 +184,500 @@ async def list_servers(
             status_code=status.HTTP_400_BAD_REQUEST, detail="limit 不能超过 50"
         )
     user_id = user.id if user else None
+    projection = parse_projection(fields, view)
+    headers: dict[str, str] = {}
+    etag = None
+
+    # 仅结果确定时（非随机排序、固定种子或使用游标）才能使用条件请求和响应缓存
+    if sort != "default" or seed is not None or not random or cursor:
+        etag = make_etag(
+            "servers",
+            await get_catalogue_version(),
+            user_id,
+            (await get_user_permissions(user_id)).fingerprint,
+            is_member,
+            modes,
+            sorted(authModes),
+            sorted(tags or []),
+            tag_mode,
+            limit,
+            offset,
+            random,
+            seed,
+            sort,
+            cursor,
+            ",".join(projection),
+        )
+        headers = cache_headers("servers", etag, private=user_id is not None)
+        if etag_matches(request, etag):
+            return not_modified(headers)
+        if cached := get_cached_response(etag):
+            return compressed_response(request, cached, headers)
+
     filter = ServerFilter(
         is_member=is_member,
         modes=modes,
         authModes=authModes,
         tags=tags,
+        tag_mode=tag_mode,
     )
-    return await GetServers(
+    content = await GetServers(
         limit=limit,
         offset=offset,
         is_random=random,
         seed=seed,
         user=user_id,
         filter=filter,
+        projection=projection,
+        sort=sort,
+        cursor=cursor,
+    )
+    if etag is not None:
+        return compressed_response(request, cache_response(etag, content), headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+# 获取服务器标签统计
+@router.get(
+    "/servers/tags",
+    response_model=ServerTagFacets,
+    summary="获取服务器标签统计",
+    responses={
+        200: {
+            "description": "成功获取标签统计",
+            "content": {
+                "application/json": {
+                    "example": {"tags": {"生存": 12, "建筑": 5, "原汁原味": 3}}
+                }
+            },
+        },
+    },
+)
+async def get_server_tags(
+    is_member: bool = Query(True, description="是否为成员服务器"),
+    modes: str | None = Query(None, description="服务器类型"),
+    authModes: list[str] = Query(["OFFLINE", "YGGDRASIL", "OFFICIAL"]),
+    tags: list[str] = Query(None),
+    tag_mode: Literal["all", "any"] = Query(
+        "all", description="标签匹配模式：all 包含全部标签，any 包含任一标签"
+    ),
+):
+    """
+    获取筛选条件下每个标签的服务器数量。
+    """
+    filter = ServerFilter(
+        is_member=is_member,
+        modes=modes,
+        authModes=authModes,
+        tags=tags,
+        tag_mode=tag_mode,
+    )
+    return await GetTagFacets(filter)
+
+
+# 获取服务器分面统计
+@router.get(
+    "/servers/facets",
+    response_model=ServerFacets,
+    summary="获取服务器分面统计",
+    responses={
+        200: {
+            "description": "成功获取分面统计",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "total": 20,
+                        "tags": {"生存": 12, "建筑": 5, "原汁原味": 3},
+                        "type": {"JAVA": 15, "BEDROCK": 5},
+                        "auth_mode": {"OFFICIAL": 14, "OFFLINE": 4, "YGGDRASIL": 2},
+                        "version": {"1.21.4": 9, "1.20.1": 6},
+                    }
+                }
+            },
+        },
+        503: {"description": "统计尚未就绪"},
+    },
+)
+async def get_server_facets(
+    is_member: bool = Query(True, description="是否为成员服务器"),
+    modes: str | None = Query(None, description="服务器类型"),
+    authModes: list[str] = Query(["OFFLINE", "YGGDRASIL", "OFFICIAL"]),
+    tags: list[str] = Query(None),
+    tag_mode: Literal["all", "any"] = Query(
+        "all", description="标签匹配模式：all 包含全部标签，any 包含任一标签"
+    ),
+    online: bool = Query(False, description="是否只统计当前在线的服务器"),
+):
+    """
+    一次获取筛选条件下各标签、类型、认证模式和版本的服务器数量。
+
+    统计由进程内分面索引增量维护，不扫描数据库。
+    """
+    filter = ServerFilter(
+        is_member=is_member,
+        modes=modes,
+        authModes=authModes,
+        tags=tags,
+        tag_mode=tag_mode,
+    )
+    return await GetServerFacets(filter, online)
+
+
+# 增量同步服务器变更
+@router.get(
+    "/servers/changes",
+    response_model=ServerChanges,
+    summary="获取服务器增量变更",
+    responses={
+        200: {
+            "description": "成功获取变更",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "token": "1760858400000-0",
+                        "resync": False,
+                        "has_more": False,
+                        "server_list": [],
+                        "deleted": [],
+                    }
+                }
+            },
+        },
+        400: {
+            "description": "token 无效",
+            "content": {"application/json": {"example": {"detail": "since 无效"}}},
+        },
+    },
+)
+async def get_server_changes(
+    user: JWTData | None = Depends(get_optional_user),
+    since: str | None = Query(None, description="上次响应返回的 token"),
+    fields: str | None = Query(
+        None, description="返回字段，逗号分隔，例如 name,status.players"
+    ),
+    view: Literal["lite", "full"] = Query("full", description="预设字段视图"),
+):
+    """
+    获取 token 之后信息或状态有变化的服务器。
+
+    未传入 since 或 token 已超出保留范围时返回 resync=true 和当前 token，
+    客户端应重新获取完整列表，之后使用该 token 继续增量同步。
+    """
+    if since is not None and not is_valid_token(since):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="since 无效"
+        )
+    user_id = user.id if user else None
+    content = await GetServerChanges(since, user_id, parse_projection(fields, view))
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def _parse_ids(ids: list[str]) -> list[int]:
+    """解析可重复传参或以逗号分隔的服务器 ID 列表"""
+    try:
+        return [int(i) for value in ids for i in value.split(",") if i.strip()]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="ids 不合法"
+        ) from e
+
+
+def _live_subscription(
+    ids: list[str] | None, filter: ServerFilter
+) -> tuple[set[int] | None, Callable[[], Awaitable[set[int]]] | None]:
+    """根据 ids 或筛选条件确定推送订阅的范围"""
+    if connection_count() >= MAX_CONNECTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="推送连接数已达上限，请稍后再试",
+        )
+    if ids:
+        server_ids = _parse_ids(ids)
+        if len(server_ids) > MAX_LIVE_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"ids 不能超过 {MAX_LIVE_IDS} 个",
+            )
+        return set(server_ids), None
+    return None, lambda: GetServerIds(filter)
+
+
+# 推送服务器状态（SSE）
+@router.get(
+    "/servers/live",
+    summary="订阅服务器状态推送（SSE）",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "每次推送一个 servers 事件，data 为变化的服务器信息数组",
+            "content": {
+                "text/event-stream": {
+                    "example": 'event: servers\ndata: [{"id":1,"name":"服务器名称",...}]\n\n'
+                }
+            },
+        },
+        400: {
+            "description": "请求参数错误",
+            "content": {"application/json": {"example": {"detail": "ids 不合法"}}},
+        },
+    },
+)
+async def live_servers(
+    user: JWTData | None = Depends(get_optional_user),
+    ids: list[str] = Query(
+        None, description="订阅的服务器 ID，不传时按筛选条件订阅列表"
+    ),
+    is_member: bool = Query(True, description="是否为成员服务器"),
+    modes: str | None = Query(None, description="服务器类型"),
+    authModes: list[str] = Query(["OFFLINE", "YGGDRASIL", "OFFICIAL"]),
+    tags: list[str] = Query(None),
+    tag_mode: Literal["all", "any"] = Query(
+        "all", description="标签匹配模式：all 包含全部标签，any 包含任一标签"
+    ),
+    fields: str | None = Query(
+        None, description="返回字段，逗号分隔，例如 name,status.players"
+    ),
+    view: Literal["lite", "full"] = Query("lite", description="预设字段视图"),
+):
+    """
+    以 Server-Sent Events 推送服务器信息和状态的变化。
+
+    指定 ids 时连接建立后会先推送一次这些服务器的当前状态。
+    """
+    projection = parse_projection(fields, view)
+    filter = ServerFilter(
+        is_member=is_member,
+        modes=modes,
+        authModes=authModes,
+        tags=tags,
+        tag_mode=tag_mode,
     )
+    server_ids, scope = _live_subscription(ids, filter)
+    updates = stream_updates(server_ids, user.id if user else None, projection, scope)
+
+    async def events():
+        async for payload in updates:
+            if payload is None:
+                yield b": ping\n\n"
+            else:
+                yield b"event: servers\ndata: " + payload + b"\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# 推送服务器状态（WebSocket）
+@router.websocket("/servers/live/ws")
+async def live_servers_ws(
+    websocket: WebSocket,
+    ids: list[str] = Query(None),
+    is_member: bool = Query(True),
+    modes: str | None = Query(None),
+    authModes: list[str] = Query(["OFFLINE", "YGGDRASIL", "OFFICIAL"]),
+    tags: list[str] = Query(None),
+    tag_mode: Literal["all", "any"] = Query("all"),
+    fields: str | None = Query(None),
+    view: Literal["lite", "full"] = Query("lite"),
+):
+    """
+    以 WebSocket 推送服务器信息和状态的变化，参数与 SSE 接口相同。
+
+    每条消息为 {"event": "servers", "data": [...]}，空闲时为 {"event": "ping"}。
+    """
+    # WebSocket 与 Request 一样携带请求头，可直接解析 Authorization
+    user = await get_optional_user(websocket)
+    try:
+        projection = parse_projection(fields, view)
+        filter = ServerFilter(
+            is_member=is_member,
+            modes=modes,
+            authModes=authModes,
+            tags=tags,
+            tag_mode=tag_mode,
+        )
+        server_ids, scope = _live_subscription(ids, filter)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+    updates = stream_updates(server_ids, user.id if user else None, projection, scope)
+    await websocket.accept()
+
+    async def push():
+        async for payload in updates:
+            if payload is None:
+                await websocket.send_text('{"event":"ping"}')
+            else:
+                await websocket.send_text(
+                    '{"event":"servers","data":' + payload.decode("utf-8") + "}"
+                )
+
+    async def receive():
+        # 只需等待客户端断开，客户端发送的消息会被忽略
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    push_task = asyncio.create_task(push())
+    receive_task = asyncio.create_task(receive())
+    try:
+        await asyncio.wait(
+            (push_task, receive_task), return_when=asyncio.FIRST_COMPLETED
+        )
+        # 推送出错时关闭连接，避免客户端停在一个不再推送的连接上
+        if (
+            push_task.done()
+            and not push_task.cancelled()
+            and (error := push_task.exception()) is not None
+            and not isinstance(error, WebSocketDisconnect)
+        ):
+            logger.error(f"服务器推送出错，关闭 WebSocket 连接: {error}")
+            with suppress(RuntimeError):
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+    finally:
+        for task in (push_task, receive_task):
+            task.cancel()
+            with suppress(asyncio.CancelledError, WebSocketDisconnect, RuntimeError):
+                await task
+        await updates.aclose()
+
+
+# 导出全部服务器
+@router.get(
+    "/servers/export",
+    summary="导出全部服务器（NDJSON）",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "逐行输出服务器信息及最新状态，每行一个 JSON 对象",
+            "content": {
+                "application/x-ndjson": {
+                    "example": '{"id":1,"name":"服务器名称","ip":"example.com",...}\n'
+                    '{"id":3,"deleted":true}\n'
+                }
+            },
+        },
+        429: {
+            "description": "导出请求过于频繁",
+            "content": {
+                "application/json": {"example": {"detail": "请求过于频繁，请稍后再试"}}
+            },
+        },
+    },
+    dependencies=[
+        Depends(
+            rate_limit(
+                "servers_export",
+                settings.EXPORT_RATE_LIMIT,
+                settings.EXPORT_RATE_WINDOW,
+            )
+        )
+    ],
+)
+async def export_servers(
+    since: datetime | None = Query(
+        None,
+        description="只导出该时间之后有变化的服务器，可传入上次响应的 X-Export-Timestamp",
+    ),
+):
+    """
+    以 NDJSON 流式导出全部服务器及其最新状态，用于镜像服务器目录。
+
+    传入 since 时为增量导出：先输出之后新建、状态更新或信息被编辑过的服务器，
+    再按 ID 输出之后被删除的服务器，每行为 {"id": N, "deleted": true}，
+    镜像端收到后应删除本地对应的服务器。
+    """
+    # 在读取数据前记录时间，下次增量导出不会遗漏本次导出期间的变化
+    exported_at = timezone.now().isoformat()
+    return StreamingResponse(
+        ExportServers(since),
+        media_type="application/x-ndjson",
+        headers={"X-Export-Timestamp": exported_at},
+    )
+
+
+# 批量获取服务器信息
+@router.get(
+    "/servers/batch",
+    response_model=ServerBatch,
+    summary="批量获取服务器信息",
+    responses={
+        200: {
+            "description": "成功获取服务器信息",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "server_list": [
+                            {
+                                "id": 2,
+                                "name": "服务器名称",
+                                "type": "BEDROCK",
+                                "is_member": True,
+                                "tags": ["生存", "建筑"],
+                                "status": {
+                                    "players": {"online": 0, "max": 15},
+                                    "delay": 59.97,
+                                },
+                                "cover_url": "/static/cover.png",
+                            }
+                        ],
+                        "missing": [404],
+                    }
+                }
+            },
+        },
+        400: {
+            "description": "请求参数错误",
+            "content": {
+                "application/json": {
+                    "example": {"detail": f"ids 不能超过 {MAX_BATCH_IDS} 个"}
+                }
+            },
+        },
+    },
+)
+async def get_servers_batch(
+    request: Request,
+    ids: list[str] = Query(..., description="服务器 ID 列表，可重复传参或以逗号分隔"),
+    user: JWTData | None = Depends(get_optional_user),
+    fields: str | None = Query(
+        None, description="返回字段，逗号分隔，例如 name,status.players"
+    ),
+    view: Literal["lite", "full"] = Query("full", description="预设字段视图"),
+):
+    """
+    一次获取多个服务器的详细信息，结果按请求顺序排列。
+    """
+    server_ids = _parse_ids(ids)
+    if len(server_ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids 不能超过 {MAX_BATCH_IDS} 个",
+        )
+    user_id = user.id if user else None
+    projection = parse_projection(fields, view)
+
+    tokens = await get_server_tokens(server_ids)
+    etag = make_etag(
+        "servers_batch",
+        *(f"{server_id}={tokens[server_id]}" for server_id in server_ids),
+        user_id,
+        (await get_user_permissions(user_id)).fingerprint,
+        ",".join(projection),
+    )
+    headers = cache_headers("servers_batch", etag, private=user_id is not None)
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    if cached := get_cached_response(etag):
+        return compressed_response(request, cached, headers)
+
+    content = await GetServers_by_ids(server_ids, user_id, tokens, projection)
+    return compressed_response(request, cache_response(etag, content), headers)
 
 
 # 获取服务器的具体信息
@@ -159,6 +713,7 @@ async def list_servers(
                                 "ansi": "\u001b[0m 服务器名称 2\u001b[0m",
                             },
                             "icon": None,
+                            "icon_hash": None,
                         },
                         "permission": "guest",
                         "cover_url": "/static/cover.png",
@@ -172,18 +727,132 @@ async def list_servers(
         },
     },
 )
-async def get_server(server_id: int, user: JWTData | None = Depends(get_optional_user)):
+async def get_server(
+    server_id: int,
+    request: Request,
+    user: JWTData | None = Depends(get_optional_user),
+    fields: str | None = Query(
+        None, description="返回字段，逗号分隔，例如 name,status.players"
+    ),
+    view: Literal["lite", "full"] = Query("full", description="预设字段视图"),
+):
     """
     获取指定 ID 服务器的详细信息。
 
     """
     user_id = user.id if user else None
-    server = await GetServer_by_id(server_id, user_id)
-    if server is None:
+    projection = parse_projection(fields, view)
+
+    version = await get_server_token(server_id)
+    etag = make_etag(
+        "server_info",
+        server_id,
+        version,
+        user_id,
+        (await get_user_permissions(user_id)).fingerprint,
+        ",".join(projection),
+    )
+    headers = cache_headers("server_info", etag, private=user_id is not None)
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    if cached := get_cached_response(etag):
+        return compressed_response(request, cached, headers)
+
+    content = await GetServer_by_id(server_id, user_id, version, projection)
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="未找到该服务器"
+        )
+    return compressed_response(request, cache_response(etag, content), headers)
+
+
+# 服务器图标
+@router.get(
+    "/servers/{server_id}/icon.png",
+    summary="获取服务器图标",
+    response_class=Response,
+    responses={
+        200: {"description": "PNG 格式的服务器图标", "content": {"image/png": {}}},
+        404: {
+            "description": "服务器没有图标",
+            "content": {"application/json": {"example": {"detail": "未找到该图标"}}},
+        },
+        422: {"description": "hash 格式不正确"},
+    },
+)
+async def get_server_icon(
+    server_id: int,
+    request: Request,
+    hash: str | None = Query(
+        None,
+        pattern="^[0-9a-f]{32}$",
+        description="图标内容哈希，即 status.icon_hash，指定时响应可永久缓存",
+    ),
+):
+    """
+    获取服务器图标。带 hash 的地址内容不会变化，可以永久缓存。
+    """
+    immutable = hash is not None
+    if hash is None:
+        hash = await get_current_icon_hash(server_id)
+    data = await get_icon(hash) if hash else None
+    if data is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="未找到该图标"
+        )
+
+    etag = f'"{hash}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": settings.CACHE_CONTROL[
+            "server_icon" if immutable else "server_icon_latest"
+        ],
+    }
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    return Response(content=data, media_type="image/png", headers=headers)
+
+
+# 服务器状态徽章
+@router.get(
+    "/servers/{server_id}/badge.svg",
+    summary="获取服务器状态徽章",
+    response_class=Response,
+    responses={
+        200: {
+            "description": "SVG 格式的在线状态和人数徽章",
+            "content": {"image/svg+xml": {}},
+        },
+        404: {
+            "description": "未找到该服务器",
+            "content": {"application/json": {"example": {"detail": "未找到该服务器"}}},
+        },
+    },
+)
+async def get_server_badge(server_id: int, request: Request):
+    """
+    获取可嵌入网页的服务器状态徽章，只读取缓存的最新状态。
+    """
+    fingerprint = await get_badge_fingerprint(server_id)
+    if fingerprint is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="未找到该服务器"
         )
-    return server
+
+    etag = make_etag("server_badge", server_id, fingerprint)
+    # 徽章与用户无关，不设置 Vary 以便 CDN 缓存
+    headers = {
+        "ETag": etag,
+        "Cache-Control": settings.CACHE_CONTROL["server_badge"],
+    }
+    if etag_matches(request, etag):
+        return not_modified(headers)
+
+    return Response(
+        content=await get_badge(server_id, fingerprint),
+        media_type="image/svg+xml",
+        headers=headers,
+    )
 
 
 @router.get(
@@ -218,6 +887,7 @@ async def get_server(server_id: int, user: JWTData | None = Depends(get_optional
                                 "ansi": "\u001b[0m 服务器名称 2\u001b[0m",
                             },
                             "icon": None,
+                            "icon_hash": None,
                         },
                     }
                 }
@@ -362,11 +1032,21 @@ async def get_server_managers(server_id: int):
         },
     },
 )
-async def get_server_gallerys(server_id: int):
+async def get_server_gallerys(server_id: int, request: Request):
     """
     获取指定 ID 服务器的相册。
     """
-    return await GetGallerylist(server_id)
+    # 相册变更会递增服务器版本号
+    etag = make_etag("server_gallery", server_id, await get_server_token(server_id))
+    headers = cache_headers("server_gallery", etag)
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    if cached := get_cached_response(etag):
+        return compressed_response(request, cached, headers)
+
+    gallery = await GetGallerylist(server_id)
+    content = dumps(gallery.model_dump())
+    return compressed_response(request, cache_response(etag, content), headers)
 
 
 # 添加服务器画册图片
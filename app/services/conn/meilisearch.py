@@ -1,19 +1,60 @@
+import asyncio
+from typing import Any
+
+import httpx
 import meilisearch
+from meilisearch.index import Index
 
 from app.config import settings
 from app.log import logger
 
+# 同步客户端，用于索引配置和后台写入
 client = meilisearch.Client(settings.MEILI_URL, settings.MEILI_API_KEY)
 
+# 请求超时（秒），搜索服务缓慢时尽快失败，不占用连接
+MEILI_TIMEOUT = httpx.Timeout(3.0, connect=1.0, pool=1.0)
+# 连接池大小，超出的请求等待空闲连接，最多等待 pool 超时
+MEILI_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+# 网络错误和 5xx 响应的重试次数
+MEILI_RETRIES = 2
+MEILI_RETRY_BACKOFF = 0.1
 
-async def init_meilisearch_index():
-    """初始化 Meilisearch 索引并设置相关配置"""
-    index = client.index(settings.MEILI_INDEX)
+# 异步客户端，复用长连接，用于请求路径上的搜索
+async_client = httpx.AsyncClient(
+    base_url=settings.MEILI_URL,
+    headers={"Authorization": f"Bearer {settings.MEILI_API_KEY}"},
+    timeout=MEILI_TIMEOUT,
+    limits=MEILI_LIMITS,
+)
+
+
+async def meili_request(method: str, path: str, json: Any = None) -> httpx.Response:
+    """
+    通过异步客户端请求 Meilisearch，网络错误和 5xx 响应按指数退避重试。
+
+    :return: 最后一次请求的响应，4xx 响应不重试直接返回
+    :raises httpx.TransportError: 重试后仍无法连接或超时
+    """
+    attempt = 0
+    while True:
+        try:
+            response = await async_client.request(method, path, json=json)
+            if response.status_code < 500 or attempt >= MEILI_RETRIES:
+                return response
+        except httpx.TransportError:
+            if attempt >= MEILI_RETRIES:
+                raise
+        await asyncio.sleep(MEILI_RETRY_BACKOFF * 2**attempt)
+        attempt += 1
+
+
+def configure_index(index: Index) -> list[int]:
+    """设置索引的可搜索、可筛选和可排序字段及排序规则，返回设置任务的 ID"""
     # 设置可搜索字段
-    index.update_searchable_attributes(
+    searchable = index.update_searchable_attributes(
         ["id", "name", "desc", "ip", "tags", "type", "auth_mode"]
     )
-    index.update_filterable_attributes(
+    filterable = index.update_filterable_attributes(
         [
             "type",
             "tags",
@@ -23,4 +64,28 @@ async def init_meilisearch_index():
             "version",
         ]
     )
+    # 人气字段由状态轮询以部分更新写入，用于按在线人数等排序
+    sortable = index.update_sortable_attributes(
+        ["online_players", "online_since", "is_online"]
+    )
+    # 请求指定排序时，排序优先于词语匹配以外的相关性规则
+    ranking = index.update_ranking_rules(
+        ["words", "sort", "typo", "proximity", "attribute", "exactness"]
+    )
+    return [
+        searchable.task_uid,
+        filterable.task_uid,
+        sortable.task_uid,
+        ranking.task_uid,
+    ]
+
+
+async def init_meilisearch_index():
+    """初始化 Meilisearch 索引并设置相关配置"""
+    configure_index(client.index(settings.MEILI_INDEX))
     logger.info("Meilisearch 索引初始化完成")
+
+
+async def close_meilisearch():
+    """关闭异步客户端的连接池"""
+    await async_client.aclose()
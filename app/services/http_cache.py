@@ -0,0 +1,43 @@
+"""HTTP 条件请求（ETag / If-None-Match）与 Cache-Control 工具"""
+
+import hashlib
+
+from fastapi import Request, Response, status
+
+from app.config import settings
+
+
+def make_etag(*parts) -> str:
+    """根据给定的组成部分生成强 ETag"""
+    raw = ":".join(str(part) for part in parts)
+    return f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """判断请求的 If-None-Match 是否命中给定 ETag"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较，代理压缩后可能加上 W/ 前缀
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def cache_headers(route: str, etag: str, private: bool = False) -> dict[str, str]:
+    """
+    生成缓存相关响应头。
+
+    :param route: 路由名称，对应 settings.CACHE_CONTROL 中的键
+    :param etag: 响应 ETag
+    :param private: 响应是否因用户而异（登录用户）
+    """
+    policy = settings.CACHE_CONTROL.get(route, "no-cache")
+    if private:
+        policy = policy.replace("public", "private")
+    return {"ETag": etag, "Cache-Control": policy, "Vary": "Authorization"}
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """返回 304 Not Modified 响应"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -0,0 +1,48 @@
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.services.auth.schemas import JWTData
+from app.services.conn.redis import redis_client
+from app.services.user.crud import get_optional_user
+
+
+def client_key(request: Request, user: JWTData | None) -> str:
+    """登录用户按用户 ID 计数，游客按客户端 IP 计数"""
+    if user:
+        return f"user:{user.id}"
+    forwarded_for = request.headers.get("X-Forwarded-For")
+    if forwarded_for:
+        return f"ip:{forwarded_for.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(bucket: str, limit: int, window: int):
+    """
+    生成固定窗口限流依赖，每个 bucket 拥有独立的额度。
+
+    :param bucket: 限流桶名称
+    :param limit: 窗口内允许的请求数
+    :param window: 窗口长度（秒）
+    """
+
+    async def dependency(
+        request: Request, user: JWTData | None = Depends(get_optional_user)
+    ) -> None:
+        now = int(time.time())
+        window_start = now - now % window
+        key = f"ratelimit:{bucket}:{client_key(request, user)}:{window_start}"
+
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, window)
+            count, _ = await pipe.execute()
+
+        if count > limit:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="请求过于频繁，请稍后再试",
+                headers={"Retry-After": str(window_start + window - now)},
+            )
+
+    return dependency
@@ -0,0 +1,118 @@
+"""预压缩响应缓存：热点 JSON 响应按 ETag 缓存，内容变化时只压缩一次"""
+
+import gzip
+from collections import OrderedDict
+from typing import NamedTuple
+
+import brotli
+from fastapi import Request, Response
+
+# 小于该大小的响应不压缩，与 main.py 中 GZipMiddleware 的 minimum_size 一致
+MINIMUM_SIZE = 1000
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# 进程内缓存的响应总字节数上限（含各压缩版本）
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# 服务端偏好顺序
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+
+class CachedResponse(NamedTuple):
+    """同一响应体的原始与各压缩版本"""
+
+    identity: bytes
+    encodings: dict[str, bytes]  # content-coding -> 压缩后的字节串
+    size: int  # 占用字节数
+
+
+# ETag -> CachedResponse，按最近使用排序
+_cache: OrderedDict[str, CachedResponse] = OrderedDict()
+_cache_bytes = 0
+
+
+def _compress(body: bytes) -> CachedResponse:
+    encodings: dict[str, bytes] = {}
+    if len(body) >= MINIMUM_SIZE:
+        encodings["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+        encodings["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    size = len(body) + sum(len(data) for data in encodings.values())
+    return CachedResponse(body, encodings, size)
+
+
+def get_cached_response(key: str) -> CachedResponse | None:
+    """按 ETag 查找缓存的响应"""
+    cached = _cache.get(key)
+    if cached is not None:
+        _cache.move_to_end(key)
+    return cached
+
+
+def cache_response(key: str, body: bytes) -> CachedResponse:
+    """压缩并缓存响应体，超出容量时淘汰最久未使用的响应"""
+    global _cache_bytes
+
+    cached = _compress(body)
+    if cached.size > MAX_CACHE_BYTES:
+        return cached
+
+    if (previous := _cache.pop(key, None)) is not None:
+        _cache_bytes -= previous.size
+    _cache[key] = cached
+    _cache_bytes += cached.size
+    while _cache_bytes > MAX_CACHE_BYTES:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= evicted.size
+    return cached
+
+
+def negotiate_encoding(request: Request, available: dict[str, bytes]) -> str | None:
+    """根据 Accept-Encoding 选择可用的压缩格式，不压缩时返回 None"""
+    header = request.headers.get("Accept-Encoding")
+    if not header or not available:
+        return None
+
+    weights: dict[str, float] = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    wildcard = weights.get("*", 0.0)
+    candidates = [
+        (weights.get(coding, wildcard), -rank, coding)
+        for rank, coding in enumerate(PREFERRED_ENCODINGS)
+        if coding in available
+    ]
+    weight, _, coding = max(candidates, default=(0.0, 0, None))
+    return coding if weight > 0 else None
+
+
+def compressed_response(
+    request: Request,
+    cached: CachedResponse,
+    headers: dict[str, str],
+    media_type: str = "application/json",
+) -> Response:
+    """
+    按客户端支持的压缩格式返回缓存的响应。
+
+    已设置 Content-Encoding 的响应会被 GZipMiddleware 原样放行，不会再次压缩。
+    """
+    headers = dict(headers)
+    encoding = negotiate_encoding(request, cached.encodings)
+    if encoding is None:
+        # 未压缩的响应由 GZipMiddleware 按阈值追加 Vary
+        content = cached.identity
+    else:
+        content = cached.encodings[encoding]
+        vary = headers.get("Vary")
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+    return Response(content=content, media_type=media_type, headers=headers)
@@ -0,0 +1,230 @@
+import asyncio
+import bisect
+import hashlib
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+from fastapi import HTTPException, status
+
+from app.log import logger
+from app.services.auth.schemas import JWTData
+from app.services.conn.redis import redis_client
+from app.services.search.schemas import SearchAnalytics, SearchQueryStats
+from app.services.user.permissions import get_user_permissions
+
+ANALYTICS_PREFIX = "search:analytics"
+# 统计数据按天存放，保留的天数
+RETENTION_DAYS = 7
+# 每天保留的不同搜索词数量上限，超出时淘汰次数最少的
+MAX_QUERIES_PER_DAY = 10000
+# 每个 worker 汇总后写入 Redis 的间隔（秒）
+FLUSH_INTERVAL = 10
+# 一个汇总周期内超过这么多次搜索后开始抽样
+SAMPLE_THRESHOLD = 1000
+SAMPLE_RATE = 0.1
+# 一个汇总周期内缓冲的不同搜索词数量上限
+MAX_BUFFERED_QUERIES = 5000
+# 耗时直方图的分桶上界（毫秒）
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class _Buffer:
+    """一个汇总周期内本 worker 的搜索统计"""
+
+    def __init__(self) -> None:
+        self.events = 0
+        self.total = 0.0
+        self.counts: Counter[str] = Counter()
+        self.zero_results: Counter[str] = Counter()
+        self.latency_sum: Counter[str] = Counter()
+        self.histogram: Counter[str] = Counter()
+        self.users: dict[str, set[str]] = {}
+
+
+_buffer = _Buffer()
+
+
+def _bucket(latency_ms: float) -> str:
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)
+    if index == len(LATENCY_BUCKETS_MS):
+        return f">{LATENCY_BUCKETS_MS[-1]}ms"
+    return f"<={LATENCY_BUCKETS_MS[index]}ms"
+
+
+def record_search(query: str, hits: int, latency: float, client: str) -> None:
+    """
+    记录一次搜索，只写入进程内缓冲，不访问 Redis。
+
+    :param query: 规范化后的搜索词
+    :param hits: 结果数量
+    :param latency: 耗时（秒）
+    :param client: 用户或客户端标识，用于统计独立用户
+    """
+    _buffer.events += 1
+    weight = 1.0
+    # 负载高时抽样，按抽样率放大计数
+    if _buffer.events > SAMPLE_THRESHOLD:
+        if random.random() >= SAMPLE_RATE:
+            return
+        weight = 1 / SAMPLE_RATE
+    if query not in _buffer.counts and len(_buffer.counts) >= MAX_BUFFERED_QUERIES:
+        return
+
+    latency_ms = latency * 1000
+    _buffer.total += weight
+    _buffer.counts[query] += weight
+    if not hits:
+        _buffer.zero_results[query] += weight
+    _buffer.latency_sum[query] += latency_ms * weight
+    _buffer.histogram[_bucket(latency_ms)] += weight
+    _buffer.users.setdefault(query, set()).add(client)
+
+
+def _day_key(day: date, name: str) -> str:
+    return f"{ANALYTICS_PREFIX}:{day:%Y%m%d}:{name}"
+
+
+def _users_key(day: date, query: str) -> str:
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+    return _day_key(day, f"users:{digest}")
+
+
+async def flush_analytics() -> None:
+    """将缓冲的统计写入 Redis 并清空缓冲"""
+    global _buffer
+    buffer, _buffer = _buffer, _Buffer()
+    if not buffer.counts:
+        return
+
+    today = date.today()
+    ttl = (RETENTION_DAYS + 1) * 86400
+    keys = {
+        name: _day_key(today, name)
+        for name in ("total", "count", "zero", "latency_sum", "latency", "users")
+    }
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.incrbyfloat(keys["total"], buffer.total)
+        for query, count in buffer.counts.items():
+            pipe.zincrby(keys["count"], count, query)
+            pipe.zincrby(keys["latency_sum"], buffer.latency_sum[query], query)
+        for query, count in buffer.zero_results.items():
+            pipe.zincrby(keys["zero"], count, query)
+        for bucket, count in buffer.histogram.items():
+            pipe.hincrbyfloat(keys["latency"], bucket, count)
+        pipe.pfadd(keys["users"], *set().union(*buffer.users.values()))
+        # 只保留分数最高的搜索词，限制内存
+        evicted_at = len(pipe)
+        pipe.zrange(keys["count"], 0, -MAX_QUERIES_PER_DAY - 1)
+        for name in ("count", "zero", "latency_sum"):
+            pipe.zremrangebyrank(keys[name], 0, -MAX_QUERIES_PER_DAY - 1)
+        for key in keys.values():
+            pipe.expire(key, ttl)
+        evicted = (await pipe.execute())[evicted_at]
+
+    # 每个搜索词的独立用户只为仍在排行中的搜索词记录，被淘汰的一并删除，
+    # 使这类键的数量不超过 MAX_QUERIES_PER_DAY
+    queries = list(buffer.users)
+    scores = await redis_client.zmscore(keys["count"], queries)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for query, score in zip(queries, scores):
+            if score is not None:
+                pipe.pfadd(_users_key(today, query), *buffer.users[query])
+                pipe.expire(_users_key(today, query), ttl)
+        if evicted:
+            pipe.delete(*(_users_key(today, query) for query in evicted))
+        await pipe.execute()
+
+
+async def flush_analytics_periodically() -> None:
+    """定期写入搜索统计，每个 worker 运行一个"""
+    try:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await flush_analytics()
+            except Exception as e:
+                logger.error(f"写入搜索统计时出错: {e}")
+    finally:
+        # 退出前写入剩余的统计
+        try:
+            await flush_analytics()
+        except Exception as e:
+            logger.error(f"写入搜索统计时出错: {e}")
+
+
+async def GetSearchAnalytics(
+    current_user: JWTData, days: int, limit: int
+) -> SearchAnalytics:
+    """汇总最近几天的搜索统计，仅全局管理员可查看"""
+    if not (await get_user_permissions(current_user.id)).is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="只有管理员可以查看搜索统计"
+        )
+
+    today = date.today()
+    day_list = [today - timedelta(days=offset) for offset in range(days)]
+
+    def keys(name: str) -> list[str]:
+        return [_day_key(day, name) for day in day_list]
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.mget(keys("total"))
+        pipe.pfcount(*keys("users"))
+        pipe.zunion(keys("count"), withscores=True)
+        pipe.zunion(keys("zero"), withscores=True)
+        pipe.zunion(keys("latency_sum"), withscores=True)
+        for key in keys("latency"):
+            pipe.hgetall(key)
+        (
+            totals,
+            unique_users,
+            counts,
+            zeros,
+            latency_sums,
+            *histograms,
+        ) = await pipe.execute()
+
+    counts, zeros, latency_sums = dict(counts), dict(zeros), dict(latency_sums)
+    histogram: Counter[str] = Counter()
+    for day_histogram in histograms:
+        for bucket, count in day_histogram.items():
+            histogram[bucket] += float(count)
+
+    top_queries = sorted(counts, key=counts.__getitem__, reverse=True)[:limit]
+    top_zero = sorted(zeros, key=zeros.__getitem__, reverse=True)[:limit]
+    reported = list(dict.fromkeys(top_queries + top_zero))
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for query in reported:
+            pipe.pfcount(*(_users_key(day, query) for day in day_list))
+        query_users = dict(zip(reported, await pipe.execute()))
+
+    def stats(query: str) -> SearchQueryStats:
+        count = counts.get(query, 0)
+        return SearchQueryStats(
+            query=query,
+            count=round(count),
+            zero_results=round(zeros.get(query, 0)),
+            avg_latency_ms=round(latency_sums[query] / count, 2)
+            if count and query in latency_sums
+            else None,
+            unique_users=query_users[query],
+        )
+
+    return SearchAnalytics(
+        days=days,
+        total=round(sum(float(total) for total in totals if total)),
+        unique_users=unique_users,
+        latency_histogram={
+            bucket: round(histogram[bucket])
+            for bucket in sorted(histogram, key=_bucket_order)
+        },
+        top_queries=[stats(query) for query in top_queries],
+        top_zero_results=[stats(query) for query in top_zero],
+    )
+
+
+def _bucket_order(bucket: str) -> float:
+    if bucket.startswith(">"):
+        return float("inf")
+    return float(bucket.removeprefix("<=").removesuffix("ms"))
@@ -0,0 +1,112 @@
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+
+import ujson
+
+from app.services.conn.redis import redis_client
+
+# 索引版本号，索引内容变化后由索引同步任务递增，缓存键包含版本号
+INDEX_VERSION_KEY = "search:index_version"
+# 人气字段的版本号，只有按人气排序的搜索结果依赖它
+POPULARITY_VERSION_KEY = "search:popularity_version"
+# 进程内缓存的搜索结果数量上限
+MAX_RESULTS = 1024
+# Redis 中搜索结果的有效期（秒），版本变化后旧结果不再命中，只需等待过期
+RESULT_TTL = 600
+
+_WHITESPACE = re.compile(r"\s+")
+_OPERATOR = re.compile(r"\s*(!=|>=|<=|=|>|<)\s*")
+_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+_OR = re.compile(r"\bOR\b|\(|\)", re.IGNORECASE)
+
+# 缓存键 -> 搜索结果
+_results: OrderedDict[str, list[dict]] = OrderedDict()
+
+
+def normalize_query(query: str) -> str:
+    """规范化搜索词：全角转半角、去除首尾空白、合并空白并忽略大小写"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", query)).strip().casefold()
+
+
+def canonical_filters(filters: str | None) -> str:
+    """
+    规范化筛选条件，使等价的写法得到相同的缓存键。
+
+    只由 AND 连接的条件会去除运算符两侧的空白并排序，包含 OR 或括号的条件只合并空白。
+    包含引号的条件只去除首尾空白，引号内的空白属于取值的一部分。
+    """
+    if not filters or not (filters := filters.strip()):
+        return ""
+    if '"' in filters or "'" in filters:
+        return filters
+    filters = _WHITESPACE.sub(" ", filters)
+    if _OR.search(filters):
+        return filters
+    clauses = {_OPERATOR.sub(r"\1", clause) for clause in _AND.split(filters)}
+    return " AND ".join(sorted(clauses))
+
+
+async def get_index_versions() -> tuple[str, str]:
+    """获取索引版本号和人气字段版本号"""
+    index_version, popularity_version = await redis_client.mget(
+        INDEX_VERSION_KEY, POPULARITY_VERSION_KEY
+    )
+    return index_version or "0", popularity_version or "0"
+
+
+def cache_version(versions: tuple[str, str], sorted_by_popularity: bool) -> str:
+    """缓存键使用的版本号，按人气排序时同时包含人气字段的版本号"""
+    if sorted_by_popularity:
+        return f"{versions[0]}.{versions[1]}"
+    return versions[0]
+
+
+async def bump_index_version() -> None:
+    """索引内容已变化，使缓存的搜索结果失效"""
+    await redis_client.incr(INDEX_VERSION_KEY)
+
+
+async def bump_popularity_version() -> None:
+    """人气字段已变化，使按人气排序的搜索结果失效"""
+    await redis_client.incr(POPULARITY_VERSION_KEY)
+
+
+def cache_key(
+    version: str, query: str, filters: str, limit: int, sort: str | None = None
+) -> str:
+    digest = hashlib.sha256(
+        ujson.dumps([query, filters, limit, sort], ensure_ascii=False).encode()
+    ).hexdigest()[:32]
+    return f"search:results:{version}:{digest}"
+
+
+async def get_cached_results(keys: list[str]) -> dict[str, list[dict]]:
+    """依次从进程内缓存和 Redis 读取多个搜索结果，只返回命中的"""
+    found = {}
+    missing = []
+    for key in keys:
+        if (results := _results.get(key)) is not None:
+            _results.move_to_end(key)
+            found[key] = results
+        else:
+            missing.append(key)
+    if missing:
+        for key, raw in zip(missing, await redis_client.mget(missing)):
+            if raw is not None:
+                found[key] = results = ujson.loads(raw)
+                _remember(key, results)
+    return found
+
+
+async def cache_results(key: str, results: list[dict]) -> None:
+    _remember(key, results)
+    await redis_client.set(key, ujson.dumps(results, ensure_ascii=False), ex=RESULT_TTL)
+
+
+def _remember(key: str, results: list[dict]) -> None:
+    _results[key] = results
+    _results.move_to_end(key)
+    if len(_results) > MAX_RESULTS:
+        _results.popitem(last=False)
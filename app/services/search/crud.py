@@ -0,0 +1,225 @@
+from typing import Any
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.log import logger
+from app.services.conn.meilisearch import meili_request
+from app.services.conn.redis import redis_client
+from app.services.search.cache import (
+    cache_key,
+    cache_results,
+    cache_version,
+    canonical_filters,
+    get_cached_results,
+    get_index_versions,
+    normalize_query,
+)
+from app.services.search.local import FilterError, local_index
+from app.services.search.schemas import SearchQuery
+from app.services.servers.cache import get_cached_statuses
+from app.services.servers.fragments import format_status
+from app.services.servers.ranking import RANK_SORTS, rank_key
+
+# 搜索排序方式 -> Meilisearch 排序表达式
+SEARCH_SORTS = {
+    "players": "online_players:desc",
+    "uptime": "online_since:asc",
+}
+
+
+async def SearchServers(
+    query: str,
+    limit: int,
+    filters: str | None,
+    with_status: bool = False,
+    sort: str | None = None,
+) -> list[dict]:
+    """
+    搜索服务器，with_status 为真时为每个结果附带最新状态。
+
+    :param sort: SEARCH_SORTS 中的排序方式，为 None 时按相关性排序
+    """
+    search_query = SearchQuery(query=query, limit=limit, filters=filters, sort=sort)
+    (hits,) = await _search([search_query])
+    if with_status:
+        (hits,) = await _with_status([hits])
+    return hits
+
+
+async def SearchServersMulti(
+    queries: list[SearchQuery], with_status: bool = False
+) -> list[list[dict]]:
+    """
+    一次执行多个搜索，未命中缓存的子查询通过 Meilisearch 多重搜索接口一并请求。
+
+    :return: 与 queries 顺序一致的搜索结果
+    """
+    results = await _search(queries)
+    if with_status:
+        results = await _with_status(results)
+    return results
+
+
+async def _with_status(results: list[list[dict]]) -> list[list[dict]]:
+    """为搜索结果附带封面和最新状态，所有结果的状态一次读取"""
+    # 状态变化频繁，不随搜索结果缓存，每次从状态缓存批量读取
+    server_ids = list({hit["id"] for hits in results for hit in hits})
+    statuses = await get_cached_statuses(server_ids)
+    return [
+        [
+            {
+                **hit,
+                "cover_url": hit.get("cover_url"),
+                "status": format_status(statuses[hit["id"]], hit["id"]),
+            }
+            for hit in hits
+        ]
+        for hits in results
+    ]
+
+
+def _normalize(query: SearchQuery) -> SearchQuery:
+    # 筛选条件按原样传给搜索后端，规范化的写法只用于缓存键
+    return query.model_copy(
+        update={
+            "query": normalize_query(query.query),
+            "filters": (query.filters or "").strip() or None,
+        }
+    )
+
+
+async def _search(queries: list[SearchQuery]) -> list[list[dict]]:
+    """
+    执行搜索，结果按规范化后的搜索词、筛选条件、条数、排序和索引版本缓存。
+
+    Meilisearch 不可用时使用进程内索引搜索，本地模式下只使用进程内索引。
+    """
+    queries = [_normalize(query) for query in queries]
+    if settings.SEARCH_BACKEND == "local":
+        return [await _search_local(query) for query in queries]
+
+    versions = await get_index_versions()
+    keys = [
+        cache_key(
+            cache_version(versions, query.sort is not None),
+            query.query,
+            canonical_filters(query.filters),
+            query.limit,
+            query.sort,
+        )
+        for query in queries
+    ]
+    found = await get_cached_results(keys)
+    # 相同的子查询只请求一次
+    missing = {key: query for key, query in zip(keys, queries) if key not in found}
+    if missing:
+        try:
+            results = await _search_meilisearch(list(missing.values()))
+        except HTTPException as e:
+            if (
+                e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE
+                or not local_index.ready
+            ):
+                raise
+            # 降级结果不缓存，Meilisearch 恢复后立即使用其结果
+            logger.warning("Meilisearch 不可用，使用进程内索引搜索")
+            for key, query in missing.items():
+                found[key] = await _search_local(query)
+        else:
+            for key, hits in zip(missing, results):
+                found[key] = hits
+                await cache_results(key, hits)
+    return [found[key] for key in keys]
+
+
+async def _search_local(query: SearchQuery) -> list[dict]:
+    """使用进程内索引搜索，指定排序时按服务器排序集合中的分数重新排序"""
+    if not local_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="搜索服务暂不可用"
+        )
+    sort = query.sort
+    try:
+        hits = local_index.search(
+            query.query, len(local_index) if sort else query.limit, query.filters
+        )
+    except FilterError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not sort or not hits:
+        return hits
+
+    scores = await redis_client.zmscore(
+        rank_key(sort, "all"), [str(hit["id"]) for hit in hits]
+    )
+    # 没有分数的服务器排在最后，分数相同时保持相关性顺序
+    descending = RANK_SORTS[sort]
+    order = sorted(
+        range(len(hits)),
+        key=lambda i: (
+            scores[i] is None,
+            -(scores[i] or 0) if descending else (scores[i] or 0),
+        ),
+    )
+    return [hits[i] for i in order[: query.limit]]
+
+
+def _meili_params(query: SearchQuery) -> dict[str, Any]:
+    params: dict[str, Any] = {"q": query.query, "limit": query.limit}
+    if query.filters:
+        params["filter"] = query.filters
+    if query.sort:
+        params["sort"] = [SEARCH_SORTS[query.sort]]
+    return params
+
+
+async def _search_meilisearch(queries: list[SearchQuery]) -> list[list[dict]]:
+    """通过异步客户端搜索服务器，多个查询使用多重搜索接口，只请求一次"""
+    if len(queries) == 1:
+        path, body = (
+            f"/indexes/{settings.MEILI_INDEX}/search",
+            _meili_params(queries[0]),
+        )
+    else:
+        path, body = (
+            "/multi-search",
+            {
+                "queries": [
+                    {"indexUid": settings.MEILI_INDEX, **_meili_params(query)}
+                    for query in queries
+                ]
+            },
+        )
+
+    try:
+        response = await meili_request("POST", path, body)
+    except httpx.TransportError as e:
+        logger.error(f"Meilisearch 请求失败: {e!r}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="搜索服务暂不可用"
+        )
+
+    if response.status_code >= 400:
+        try:
+            error = response.json()
+        except ValueError:
+            error = {}
+        # 只有搜索参数错误（筛选条件、排序格式等）是客户端的问题
+        if response.status_code < 500 and str(error.get("code", "")).startswith(
+            "invalid_search_"
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error.get("message", "搜索参数无效"),
+            )
+        # 密钥错误、索引不存在等属于服务端配置问题，不向客户端暴露内部信息
+        logger.error(f"Meilisearch 返回错误: {response.status_code} {response.text}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="搜索服务暂不可用"
+        )
+
+    data = response.json()
+    if len(queries) == 1:
+        return [data.get("hits", [])]
+    return [result.get("hits", []) for result in data["results"]]
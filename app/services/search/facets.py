@@ -0,0 +1,85 @@
+from collections.abc import Iterable
+
+# 统计的字段
+FACET_FIELDS = ("tags", "type", "auth_mode", "version")
+
+
+class FacetIndex:
+    """
+    服务器分面索引：每个字段的每个取值对应一组服务器 ID，随服务器变化增量维护。
+
+    统计时与筛选后的服务器集合求交集，不需要扫描数据库。
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.reset([])
+
+    def reset(self, documents: Iterable[dict]) -> None:
+        # 字段 -> 取值 -> 服务器 ID
+        self._postings: dict[str, dict[str, set[int]]] = {
+            field: {} for field in FACET_FIELDS
+        }
+        # 服务器 ID -> 字段 -> 取值
+        self._values: dict[int, dict[str, list[str]]] = {}
+        self.members: set[int] = set()
+        for document in documents:
+            self.upsert(document)
+
+    @property
+    def server_ids(self) -> set[int]:
+        return set(self._values)
+
+    def upsert(self, document: dict) -> None:
+        server_id = document["id"]
+        self.remove(server_id)
+
+        values = {}
+        for field in FACET_FIELDS:
+            value = document.get(field)
+            if field == "tags":
+                values[field] = list(dict.fromkeys(value or []))
+            else:
+                values[field] = [value] if value else []
+            for item in values[field]:
+                self._postings[field].setdefault(item, set()).add(server_id)
+        self._values[server_id] = values
+        if document["is_member"]:
+            self.members.add(server_id)
+
+    def remove(self, server_id: int) -> None:
+        if (values := self._values.pop(server_id, None)) is None:
+            return
+        for field, items in values.items():
+            for item in items:
+                ids = self._postings[field][item]
+                ids.discard(server_id)
+                if not ids:
+                    del self._postings[field][item]
+        self.members.discard(server_id)
+
+    def lookup(self, field: str, value: str) -> set[int]:
+        return self._postings[field].get(value, set())
+
+    def count(self, server_ids: set[int] | None = None) -> dict[str, dict[str, int]]:
+        """
+        统计各字段取值的服务器数量，按数量从多到少排列。
+
+        :param server_ids: 只统计这些服务器，为 None 时统计全部
+        """
+        facets = {}
+        for field, postings in self._postings.items():
+            counts = {
+                value: len(ids) if server_ids is None else len(ids & server_ids)
+                for value, ids in postings.items()
+            }
+            facets[field] = dict(
+                sorted(
+                    ((value, count) for value, count in counts.items() if count),
+                    key=lambda item: (-item[1], item[0]),
+                )
+            )
+        return facets
+
+
+facet_index = FacetIndex()
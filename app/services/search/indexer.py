@@ -0,0 +1,358 @@
+import asyncio
+import time
+
+import ujson
+from tortoise import timezone
+from tortoise.signals import post_delete, post_save
+
+from app.config import settings
+from app.log import logger
+from app.models import Server, ServerLog
+from app.services.conn.meilisearch import client, configure_index
+from app.services.conn.redis import redis_client
+from app.services.search.cache import bump_index_version, bump_popularity_version
+from app.services.servers.cache import STATUS_KEY
+from app.services.servers.ranking import ONLINE_SINCE_KEY
+
+# 待写入索引的服务器（set），由各 worker 写入，持锁进程统一提交
+PENDING_UPSERTS_KEY = "search:pending:upsert"
+PENDING_DELETES_KEY = "search:pending:delete"
+# 已提交但未确认的 Meilisearch 任务（hash: task_uid -> {"op", "ids"}）
+TASKS_KEY = "search:tasks"
+# 服务器连续提交失败的次数（hash: server_id -> count）
+ATTEMPTS_KEY = "search:attempts"
+# 服务器搜索文档变化的通知，各 worker 据此更新进程内索引
+DOCUMENT_CHANNEL = "search:documents"
+
+# 提交间隔（秒），间隔内的多次修改合并为一次请求
+FLUSH_INTERVAL = 2.0
+# 人气数据的提交间隔（秒），一轮状态轮询内的变化大致合并为一两次请求
+POPULARITY_FLUSH_INTERVAL = 30.0
+# 单次提交的最大文档数
+BATCH_SIZE = 500
+# 单个服务器最多重试的次数
+MAX_RETRIES = 5
+# 全量重建时等待单个任务完成的最长时间（毫秒）
+REINDEX_TASK_TIMEOUT = 60_000
+
+SEARCH_DOCUMENT_FIELDS = (
+    "id",
+    "name",
+    "desc",
+    "ip",
+    "type",
+    "version",
+    "link",
+    "is_member",
+    "is_hide",
+    "auth_mode",
+    "tags",
+)
+
+
+# 由状态轮询更新的人气字段，可用于排序
+POPULARITY_FIELDS = ("is_online", "online_players", "online_since")
+
+# 已提交到索引的人气数据，只提交变化的值（持锁进程内）
+_pushed_popularity: dict[int, dict] = {}
+# 等待提交的人气数据，同一服务器只保留最新值
+_pending_popularity: dict[int, dict] = {}
+
+
+def to_document(server: dict) -> dict:
+    """将服务器行转换为搜索文档，隐藏的服务器不索引 IP"""
+    document = {field: server[field] for field in SEARCH_DOCUMENT_FIELDS}
+    if server["is_hide"]:
+        document["ip"] = None
+    document["cover_url"] = server["cover_url"]
+    return document
+
+
+async def load_documents(server_ids: list[int]) -> list[dict]:
+    """从数据库读取服务器的搜索文档，不存在的服务器不返回"""
+    servers = await Server.filter(id__in=server_ids).values(
+        *SEARCH_DOCUMENT_FIELDS, cover_url="cover_hash__file_path"
+    )
+    return [to_document(server) for server in servers]
+
+
+async def enqueue_upsert(server_id: int) -> None:
+    """登记需要更新索引的服务器"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.sadd(PENDING_UPSERTS_KEY, str(server_id))
+        pipe.srem(PENDING_DELETES_KEY, str(server_id))
+        pipe.publish(DOCUMENT_CHANNEL, str(server_id))
+        await pipe.execute()
+
+
+async def enqueue_delete(server_id: int) -> None:
+    """登记需要从索引删除的服务器"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.sadd(PENDING_DELETES_KEY, str(server_id))
+        pipe.srem(PENDING_UPSERTS_KEY, str(server_id))
+        pipe.publish(DOCUMENT_CHANNEL, str(server_id))
+        await pipe.execute()
+
+
+def popularity_fields(stat_data: dict | None, online_since: float | None) -> dict:
+    """根据最新状态计算人气字段，离线时没有上线时间"""
+    online = bool(stat_data)
+    return {
+        "is_online": online,
+        "online_players": stat_data["players"]["online"] if online else 0,
+        "online_since": int(online_since) if online and online_since else None,
+    }
+
+
+def record_popularity(
+    server_id: int, stat_data: dict | None, online_since: float | None
+) -> None:
+    """登记服务器的最新人气数据，与已提交的值相同时忽略，由状态轮询调用"""
+    fields = popularity_fields(stat_data, online_since)
+    if _pushed_popularity.get(server_id) == fields:
+        _pending_popularity.pop(server_id, None)
+    else:
+        _pending_popularity[server_id] = fields
+
+
+async def load_popularity(server_ids: list[int]) -> dict[int, dict]:
+    """从状态缓存读取服务器的人气字段，用于全量重建"""
+    keys = [str(server_id) for server_id in server_ids]
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hmget(STATUS_KEY, keys)
+        pipe.hmget(ONLINE_SINCE_KEY, keys)
+        statuses, online_since = await pipe.execute()
+    return {
+        server_id: popularity_fields(
+            ujson.loads(raw) if raw else None, float(since) if since else None
+        )
+        for server_id, raw, since in zip(server_ids, statuses, online_since)
+    }
+
+
+@post_save(Server)
+async def _on_server_saved(sender, instance: Server, *args) -> None:
+    await enqueue_upsert(instance.id)
+
+
+@post_delete(Server)
+async def _on_server_deleted(sender, instance: Server, *args) -> None:
+    await enqueue_delete(instance.id)
+
+
+async def _submit(op: str, server_ids: list[int]) -> None:
+    """提交一批文档写入或删除，并记录任务 ID"""
+    index = client.index(settings.MEILI_INDEX)
+    if op == "upsert":
+        documents = await load_documents(server_ids)
+        # 提交前已被删除的服务器转为删除
+        if missing := set(server_ids) - {document["id"] for document in documents}:
+            await _submit("delete", sorted(missing))
+        if not documents:
+            return
+        # 部分更新，保留状态轮询写入的人气字段
+        task = await asyncio.to_thread(index.update_documents, documents, "id")
+    else:
+        task = await asyncio.to_thread(index.delete_documents, server_ids)
+    await redis_client.hset(
+        TASKS_KEY, str(task.task_uid), ujson.dumps({"op": op, "ids": server_ids})
+    )
+
+
+async def _retry(op: str, server_ids: list[int]) -> None:
+    """将失败的服务器重新登记，超过重试次数的放弃"""
+    if op == "popularity":
+        # 忘记已提交的值，下次轮询时重新提交
+        for server_id in server_ids:
+            _pushed_popularity.pop(server_id, None)
+        return
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for server_id in server_ids:
+            pipe.hincrby(ATTEMPTS_KEY, str(server_id), 1)
+        attempts = await pipe.execute()
+
+    retry = [
+        server_id
+        for server_id, count in zip(server_ids, attempts)
+        if count <= MAX_RETRIES
+    ]
+    if dropped := [server_id for server_id in server_ids if server_id not in retry]:
+        logger.error(f"服务器 {dropped} 的索引{op}多次失败，已放弃")
+        await redis_client.hdel(ATTEMPTS_KEY, *map(str, dropped))
+    for server_id in retry:
+        if op == "upsert":
+            await enqueue_upsert(server_id)
+        else:
+            await enqueue_delete(server_id)
+
+
+async def check_tasks() -> None:
+    """检查已提交任务的状态，失败的任务重新登记，有任务完成时使搜索缓存失效"""
+    applied = popularity_applied = False
+    for task_uid, raw in (await redis_client.hgetall(TASKS_KEY)).items():
+        task = await asyncio.to_thread(client.get_task, int(task_uid))
+        if task.status in ("enqueued", "processing"):
+            continue
+
+        await redis_client.hdel(TASKS_KEY, task_uid)
+        info = ujson.loads(raw)
+        if task.status == "succeeded" and info["op"] == "popularity":
+            popularity_applied = True
+        elif task.status == "succeeded":
+            applied = True
+            await redis_client.hdel(ATTEMPTS_KEY, *map(str, info["ids"]))
+        else:
+            logger.warning(f"Meilisearch 任务 {task_uid} 失败: {task.error}")
+            await _retry(info["op"], info["ids"])
+
+    if applied:
+        await bump_index_version()
+    if popularity_applied:
+        await bump_popularity_version()
+
+
+async def flush_pending() -> None:
+    """提交所有待处理的索引变更"""
+    for op, key in (("delete", PENDING_DELETES_KEY), ("upsert", PENDING_UPSERTS_KEY)):
+        while members := await redis_client.spop(key, BATCH_SIZE):
+            server_ids = sorted(int(member) for member in members)
+            try:
+                await _submit(op, server_ids)
+            except Exception:
+                # 提交失败（如 Meilisearch 不可用）时放回队列，下次重试
+                await redis_client.sadd(key, *map(str, server_ids))
+                raise
+
+
+async def flush_popularity() -> None:
+    """以部分更新提交变化的人气数据"""
+    if not _pending_popularity:
+        return
+    pending = dict(_pending_popularity)
+    _pending_popularity.clear()
+
+    # 部分更新会创建不存在的文档，跳过已删除的服务器
+    existing = set(
+        await Server.filter(id__in=list(pending)).values_list("id", flat=True)
+    )
+    updates = {
+        server_id: fields
+        for server_id, fields in pending.items()
+        if server_id in existing
+    }
+    if not updates:
+        return
+
+    index = client.index(settings.MEILI_INDEX)
+    server_ids = sorted(updates)
+    try:
+        task = await asyncio.to_thread(
+            index.update_documents,
+            [{"id": server_id, **updates[server_id]} for server_id in server_ids],
+            "id",
+        )
+    except Exception:
+        # 放回队列，不覆盖期间登记的更新值
+        for server_id, fields in updates.items():
+            _pending_popularity.setdefault(server_id, fields)
+        raise
+    _pushed_popularity.update(updates)
+    await redis_client.hset(
+        TASKS_KEY,
+        str(task.task_uid),
+        ujson.dumps({"op": "popularity", "ids": server_ids}),
+    )
+
+
+async def run_indexer(interval: float = FLUSH_INTERVAL) -> None:
+    """定期合并提交索引变更，由持锁进程运行"""
+    last_popularity_flush = time.monotonic()
+    while True:
+        try:
+            await check_tasks()
+            await flush_pending()
+            if time.monotonic() - last_popularity_flush >= POPULARITY_FLUSH_INTERVAL:
+                last_popularity_flush = time.monotonic()
+                await flush_popularity()
+        except Exception as exc:
+            logger.error(f"同步搜索索引时出错: {exc}")
+        await asyncio.sleep(interval)
+
+
+async def _wait(task_uid: int) -> None:
+    task = await asyncio.to_thread(
+        client.wait_for_task, task_uid, timeout_in_ms=REINDEX_TASK_TIMEOUT
+    )
+    if task.status != "succeeded":
+        raise RuntimeError(f"Meilisearch 任务 {task_uid} 失败: {task.error}")
+
+
+async def _run(func, *args) -> None:
+    """在线程中调用 Meilisearch 并等待生成的任务完成"""
+    await _wait((await asyncio.to_thread(func, *args)).task_uid)
+
+
+async def _index_uids() -> set[str]:
+    indexes = await asyncio.to_thread(client.get_indexes, {"limit": 1000})
+    return {index.uid for index in indexes["results"]}
+
+
+async def reindex_all(batch_size: int = 1000) -> int:
+    """
+    全量重建搜索索引：写入临时索引后与正式索引交换，重建期间搜索不受影响。
+
+    :return: 写入的文档数量
+    """
+    # 与 ServerLog.created_at 使用同一时钟和时区
+    started_at = timezone.now()
+    temp_uid = f"{settings.MEILI_INDEX}_reindex"
+    # 临时索引只在上次重建中断时残留，不存在时删除任务会失败
+    if temp_uid in await _index_uids():
+        await _run(client.delete_index, temp_uid)
+    await _run(client.create_index, temp_uid, {"primaryKey": "id"})
+    temp_index = client.index(temp_uid)
+    for task_uid in await asyncio.to_thread(configure_index, temp_index):
+        await _wait(task_uid)
+
+    # 按 ID 分批读取，避免一次加载全部服务器
+    total = 0
+    last_id = 0
+    task_uids = []
+    while True:
+        servers = (
+            await Server.filter(id__gt=last_id)
+            .order_by("id")
+            .limit(batch_size)
+            .values(*SEARCH_DOCUMENT_FIELDS, cover_url="cover_hash__file_path")
+        )
+        if not servers:
+            break
+        popularity = await load_popularity([server["id"] for server in servers])
+        documents = [
+            {**to_document(server), **popularity[server["id"]]} for server in servers
+        ]
+        task = await asyncio.to_thread(temp_index.add_documents, documents, "id")
+        task_uids.append(task.task_uid)
+        total += len(documents)
+        last_id = servers[-1]["id"]
+    for task_uid in task_uids:
+        await _wait(task_uid)
+
+    # 交换要求两个索引都存在
+    if settings.MEILI_INDEX not in await _index_uids():
+        await _run(client.create_index, settings.MEILI_INDEX, {"primaryKey": "id"})
+    await _run(client.swap_indexes, [{"indexes": [settings.MEILI_INDEX, temp_uid]}])
+    await asyncio.to_thread(client.delete_index, temp_uid)
+    await bump_index_version()
+
+    # 重建期间被修改的服务器可能读到了旧数据，重新登记
+    for server_id in set(
+        await ServerLog.filter(created_at__gte=started_at).values_list(
+            "server_id", flat=True
+        )
+    ):
+        await enqueue_upsert(server_id)
+
+    logger.info(f"搜索索引重建完成，共 {total} 个文档")
+    return total
@@ -0,0 +1,365 @@
+import asyncio
+import math
+import re
+import unicodedata
+from array import array
+from collections import defaultdict
+
+from app.log import logger
+from app.models import Server
+from app.services.conn.redis import redis_client
+from app.services.search.indexer import (
+    DOCUMENT_CHANNEL,
+    SEARCH_DOCUMENT_FIELDS,
+    load_documents,
+    to_document,
+)
+from app.services.search.facets import facet_index
+from app.services.search.suggest import suggest_index
+
+# 参与检索的字段及其权重
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "type": 1.0, "ip": 1.0, "desc": 1.0}
+# 可筛选字段，与 Meilisearch 的 filterable_attributes 一致
+FILTERABLE_FIELDS = ("type", "tags", "auth_mode", "is_member", "is_hide", "version")
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 连续的数字字母或 CJK 字符
+_RUN = re.compile(r"[0-9a-z]+|[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text: str, *, unigrams: bool = True) -> list[str]:
+    """
+    分词：数字字母按单词切分，CJK 按相邻两字切分。
+
+    :param unigrams: 是否同时输出 CJK 单字，建索引时开启以支持单字搜索
+    """
+    tokens = []
+    for match in _RUN.finditer(_normalize(text)):
+        run = match.group()
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+            continue
+        if unigrams:
+            tokens.extend(run)
+        tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _field_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return " ".join(map(str, value))
+    return str(value)
+
+
+class FilterError(ValueError):
+    pass
+
+
+_FILTER_TOKEN = re.compile(
+    r"\s*(?:(?P<op>!=|=|\(|\)|\[|\]|,)|\"(?P<dq>[^\"]*)\"|'(?P<sq>[^']*)'|(?P<word>[^\s=!()\[\],\"']+))"
+)
+
+
+def _lex_filter(filters: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    filters = filters.rstrip()
+    while pos < len(filters):
+        match = _FILTER_TOKEN.match(filters, pos)
+        if match is None:
+            raise FilterError(f"无法解析筛选条件: {filters[pos:]}")
+        pos = match.end()
+        if match["op"]:
+            tokens.append(("op", match["op"]))
+        elif match["word"] is not None:
+            tokens.append(("word", match["word"]))
+        else:
+            tokens.append(
+                ("value", match["dq"] if match["dq"] is not None else match["sq"])
+            )
+    return tokens
+
+
+class _FilterParser:
+    """
+    解析 Meilisearch 筛选语法的子集：=、!=、IN [...]、AND、OR、NOT 和括号。
+    """
+
+    def __init__(self, filters: str) -> None:
+        self.tokens = _lex_filter(filters)
+        self.pos = 0
+
+    def parse(self):
+        predicate = self._or()
+        if self.pos != len(self.tokens):
+            raise FilterError(f"筛选条件中有多余的内容: {self.tokens[self.pos][1]}")
+        return predicate
+
+    def _peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _keyword(self, keyword: str) -> bool:
+        token = self._peek()
+        if token and token[0] == "word" and token[1].upper() == keyword:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, op: str) -> None:
+        if self._peek() != ("op", op):
+            raise FilterError(f"筛选条件缺少 {op}")
+        self.pos += 1
+
+    def _value(self) -> str:
+        token = self._peek()
+        if token is None or token[0] == "op":
+            raise FilterError("筛选条件缺少值")
+        self.pos += 1
+        return token[1]
+
+    def _or(self):
+        predicates = [self._and()]
+        while self._keyword("OR"):
+            predicates.append(self._and())
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda document: any(p(document) for p in predicates)
+
+    def _and(self):
+        predicates = [self._not()]
+        while self._keyword("AND"):
+            predicates.append(self._not())
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda document: all(p(document) for p in predicates)
+
+    def _not(self):
+        if self._keyword("NOT"):
+            predicate = self._not()
+            return lambda document: not predicate(document)
+        if self._peek() == ("op", "("):
+            self.pos += 1
+            predicate = self._or()
+            self._expect(")")
+            return predicate
+        return self._condition()
+
+    def _condition(self):
+        token = self._peek()
+        if token is None or token[0] != "word":
+            raise FilterError("筛选条件缺少字段名")
+        field = token[1]
+        if field not in FILTERABLE_FIELDS:
+            raise FilterError(f"字段 {field} 不可筛选")
+        self.pos += 1
+
+        if self._keyword("IN"):
+            self._expect("[")
+            values = {_normalize(self._value())}
+            while self._peek() == ("op", ","):
+                self.pos += 1
+                values.add(_normalize(self._value()))
+            self._expect("]")
+            return lambda document: bool(_field_values(document, field) & values)
+
+        token = self._peek()
+        if token not in (("op", "="), ("op", "!=")):
+            raise FilterError("仅支持 =、!= 和 IN 筛选")
+        self.pos += 1
+        value = _normalize(self._value())
+        if token[1] == "=":
+            return lambda document: value in _field_values(document, field)
+        return lambda document: value not in _field_values(document, field)
+
+
+def _field_values(document: dict, field: str) -> set[str]:
+    value = document.get(field)
+    if value is None:
+        return set()
+    if isinstance(value, bool):
+        return {"true" if value else "false"}
+    if isinstance(value, list):
+        return {_normalize(str(item)) for item in value}
+    return {_normalize(str(value))}
+
+
+def parse_filters(filters: str | None):
+    """
+    将筛选条件解析为判断函数。
+
+    :raises FilterError: 语法不受支持或字段不可筛选
+    """
+    if not filters or not filters.strip():
+        return None
+    return _FilterParser(filters).parse()
+
+
+class LocalSearchIndex:
+    """
+    进程内的服务器搜索索引：倒排表按词存放紧凑的文档 ID 和加权词频数组，使用 BM25 打分。
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.reset([])
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def reset(self, documents: list[dict]) -> None:
+        """用给定文档重建索引，期间不让出事件循环，搜索不会看到不完整的索引"""
+        self.documents: dict[int, dict] = {}
+        # 词 -> (文档 ID, 加权词频)
+        self._postings: dict[str, tuple[array, array]] = {}
+        # 文档 ID -> (词 -> 加权词频)，用于更新时从倒排表移除
+        self._terms: dict[int, dict[str, float]] = {}
+        self._lengths: dict[int, float] = {}
+        self._total_length = 0.0
+        for document in documents:
+            self.upsert(document)
+
+    def upsert(self, document: dict) -> None:
+        doc_id = document["id"]
+        self.remove(doc_id)
+
+        terms: dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(document.get(field))):
+                terms[token] += weight
+        for token, frequency in terms.items():
+            if (posting := self._postings.get(token)) is None:
+                posting = self._postings[token] = (array("I"), array("f"))
+            posting[0].append(doc_id)
+            posting[1].append(frequency)
+
+        self.documents[doc_id] = document
+        self._terms[doc_id] = terms
+        self._lengths[doc_id] = length = sum(terms.values())
+        self._total_length += length
+
+    def remove(self, doc_id: int) -> None:
+        if (terms := self._terms.pop(doc_id, None)) is None:
+            return
+        for token in terms:
+            ids, frequencies = self._postings[token]
+            position = ids.index(doc_id)
+            del ids[position]
+            del frequencies[position]
+            if not ids:
+                del self._postings[token]
+        del self.documents[doc_id]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def search(self, query: str, limit: int, filters: str | None = None) -> list[dict]:
+        """
+        搜索文档，按匹配的词数和 BM25 得分排序，空搜索词按 ID 返回。
+
+        :raises FilterError: 筛选条件无效
+        """
+        predicate = parse_filters(filters)
+        tokens = list(dict.fromkeys(tokenize(query, unigrams=False)))
+        if not tokens:
+            return [
+                self.documents[doc_id]
+                for doc_id in sorted(self.documents)
+                if predicate is None or predicate(self.documents[doc_id])
+            ][:limit]
+
+        total = len(self.documents)
+        average_length = self._total_length / total if total else 1.0
+        scores: dict[int, float] = defaultdict(float)
+        matched: dict[int, int] = defaultdict(int)
+        for token in tokens:
+            if (posting := self._postings.get(token)) is None:
+                continue
+            ids, frequencies = posting
+            idf = math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+            for doc_id, frequency in zip(ids, frequencies):
+                norm = BM25_K1 * (
+                    1 - BM25_B + BM25_B * self._lengths[doc_id] / average_length
+                )
+                scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                matched[doc_id] += 1
+
+        ranked = sorted(scores, key=lambda doc_id: (-matched[doc_id], -scores[doc_id]))
+        results = []
+        for doc_id in ranked:
+            document = self.documents[doc_id]
+            if predicate is None or predicate(document):
+                results.append(document)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+local_index = LocalSearchIndex()
+
+
+async def build_local_index(batch_size: int = 1000) -> None:
+    """从数据库构建进程内搜索索引、联想词索引和分面索引"""
+    documents = []
+    last_id = 0
+    while servers := (
+        await Server.filter(id__gt=last_id)
+        .order_by("id")
+        .limit(batch_size)
+        .values(*SEARCH_DOCUMENT_FIELDS, cover_url="cover_hash__file_path")
+    ):
+        documents.extend(to_document(server) for server in servers)
+        last_id = servers[-1]["id"]
+
+    local_index.reset(documents)
+    local_index.ready = True
+    suggest_index.reset(documents)
+    facet_index.reset(documents)
+    facet_index.ready = True
+    logger.info(f"进程内搜索索引构建完成，共 {len(local_index)} 个文档")
+
+
+async def _apply_changes(server_ids: set[int]) -> None:
+    documents = await load_documents(sorted(server_ids))
+    for document in documents:
+        local_index.upsert(document)
+        suggest_index.upsert(document)
+        facet_index.upsert(document)
+    for server_id in server_ids - {document["id"] for document in documents}:
+        local_index.remove(server_id)
+        suggest_index.remove(server_id)
+        facet_index.remove(server_id)
+
+
+async def listen_document_changes() -> None:
+    """订阅搜索文档变化，增量更新进程内的各索引，每个 worker 运行一个"""
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(DOCUMENT_CHANNEL)
+            # 订阅前或断线期间可能错过变化，重新构建
+            await build_local_index()
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                changed: set[int] = set()
+                while message is not None:
+                    changed.add(int(message["data"]))
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=0
+                    )
+                if changed:
+                    await _apply_changes(changed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"搜索文档订阅中断，5 秒后重连: {e}")
+            await asyncio.sleep(5)
+        finally:
+            await pubsub.aclose()
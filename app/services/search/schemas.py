@@ -0,0 +1,62 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+# 单次多重搜索最多包含的子查询数量
+MAX_MULTI_QUERIES = 10
+
+
+class SearchQuery(BaseModel):
+    query: str = Field(title="搜索关键词", description="搜索关键词，可为空")
+    limit: int = Field(10, ge=1, le=100, title="返回条数", description="返回条数")
+    filters: str | None = Field(
+        None, title="筛选条件", description="筛选条件，例如 'is_member=true'"
+    )
+    sort: Literal["players", "uptime"] | None = Field(
+        None,
+        title="排序方式",
+        description="players 在线人数多的在前，uptime 持续在线时间长的在前，默认按相关性",
+    )
+
+
+class MultiSearchRequest(BaseModel):
+    queries: list[SearchQuery] = Field(
+        min_length=1,
+        max_length=MAX_MULTI_QUERIES,
+        title="子查询",
+        description="依次执行的搜索，每个子查询有各自的条数和筛选条件",
+    )
+    with_status: bool = Field(
+        False,
+        title="附带状态",
+        description="是否为每个结果附带封面和最新状态（在线人数、延迟等）",
+    )
+
+
+class SearchQueryStats(BaseModel):
+    query: str = Field(title="搜索词", description="规范化后的搜索词")
+    count: int = Field(title="搜索次数", description="抽样时为估算值")
+    zero_results: int = Field(title="无结果次数", description="没有返回任何结果的次数")
+    avg_latency_ms: float | None = Field(
+        title="平均耗时", description="平均耗时（毫秒），没有记录时为 null"
+    )
+    unique_users: int = Field(
+        title="独立用户数", description="搜索过该词的用户或客户端数量（近似值）"
+    )
+
+
+class SearchAnalytics(BaseModel):
+    days: int = Field(title="统计天数", description="统计最近几天（含今天）的数据")
+    total: int = Field(title="搜索次数", description="总搜索次数")
+    unique_users: int = Field(
+        title="独立用户数", description="搜索过的用户或客户端数量（近似值）"
+    )
+    latency_histogram: dict[str, int] = Field(
+        title="耗时分布", description="各耗时区间的搜索次数"
+    )
+    top_queries: list[SearchQueryStats] = Field(
+        title="热门搜索词", description="按搜索次数排序"
+    )
+    top_zero_results: list[SearchQueryStats] = Field(
+        title="无结果搜索词", description="按无结果次数排序"
+    )
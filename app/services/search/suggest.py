@@ -0,0 +1,161 @@
+import asyncio
+import bisect
+import heapq
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from app.services.conn.redis import redis_client
+from app.services.servers.ranking import rank_key
+
+# 缓存结果的前缀数量上限
+MAX_CACHED_PREFIXES = 4096
+# 人气权重（在线人数）的刷新间隔（秒）
+WEIGHT_REFRESH_INTERVAL = 60
+
+# 名称中可作为联想起点的位置：英文单词开头和空白之后
+_WORD_START = re.compile(r"(?<=[^0-9a-z])[0-9a-z]|(?<=\s)\S")
+
+
+def normalize_prefix(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class SuggestIndex:
+    """
+    联想词前缀索引：按规范化文本排序的数组，前缀查询用二分定位区间，再按人气取前 k 个。
+
+    联想词包括服务器名称（名称中的每个单词也可作为起点）和标签。
+    服务器按在线人数加权，标签按使用它的服务器数量加权。
+    """
+
+    def __init__(self) -> None:
+        # (规范化文本, 类型, 服务器 ID 或标签)，按规范化文本排序
+        self._keys: list[tuple[str, str, int | str]] = []
+        # 服务器 ID -> 名称
+        self._names: dict[int, str] = {}
+        # 服务器 ID -> 标签
+        self._tags: dict[int, list[str]] = {}
+        # 标签 -> 使用它的服务器数量
+        self._tag_counts: dict[str, int] = {}
+        # 服务器 ID -> 在线人数
+        self.players: dict[int, int] = {}
+        self.weights_refreshed_at = 0.0
+        # 前缀 -> 联想结果
+        self._cache: OrderedDict[tuple[str, int], list[dict]] = OrderedDict()
+
+    def _server_keys(self, server_id: int, name: str) -> list[tuple]:
+        normalized = normalize_prefix(name)
+        starts = {0} | {match.start() for match in _WORD_START.finditer(normalized)}
+        return [(normalized[start:], "server", server_id) for start in sorted(starts)]
+
+    def _insert(self, key: tuple) -> None:
+        position = bisect.bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            self._keys.insert(position, key)
+
+    def _remove(self, key: tuple) -> None:
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def upsert(self, document: dict) -> None:
+        server_id = document["id"]
+        self.remove(server_id)
+        self._names[server_id] = document["name"]
+        self._tags[server_id] = tags = list(dict.fromkeys(document["tags"] or []))
+        for key in self._server_keys(server_id, document["name"]):
+            self._insert(key)
+        for tag in tags:
+            self._tag_counts[tag] = self._tag_counts.get(tag, 0) + 1
+            if self._tag_counts[tag] == 1:
+                self._insert((normalize_prefix(tag), "tag", tag))
+        self._cache.clear()
+
+    def remove(self, server_id: int) -> None:
+        if (name := self._names.pop(server_id, None)) is None:
+            return
+        for key in self._server_keys(server_id, name):
+            self._remove(key)
+        for tag in self._tags.pop(server_id):
+            self._tag_counts[tag] -= 1
+            if not self._tag_counts[tag]:
+                del self._tag_counts[tag]
+                self._remove((normalize_prefix(tag), "tag", tag))
+        self._cache.clear()
+
+    def reset(self, documents: list[dict]) -> None:
+        self._keys, self._names, self._tags, self._tag_counts = [], {}, {}, {}
+        for document in documents:
+            self.upsert(document)
+
+    def set_players(self, players: dict[int, int]) -> None:
+        self.players = players
+        self.weights_refreshed_at = time.monotonic()
+        self._cache.clear()
+
+    def _weight(self, key: tuple) -> int:
+        if key[1] == "tag":
+            return self._tag_counts.get(key[2], 0)
+        return self.players.get(key[2], 0)
+
+    def suggest(self, prefix: str, limit: int) -> list[dict]:
+        """返回以 prefix 开头、人气最高的 limit 个联想词"""
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        cache_key = (prefix, limit)
+        if (results := self._cache.get(cache_key)) is not None:
+            self._cache.move_to_end(cache_key)
+            return results
+
+        start = bisect.bisect_left(self._keys, (prefix,))
+        end = bisect.bisect_left(self._keys, (prefix + "\U0010ffff",), lo=start)
+        # 同一服务器名称中的多个单词都可能匹配，只保留一次
+        seen: set[tuple[str, int | str]] = set()
+        candidates = []
+        for key in self._keys[start:end]:
+            if (key[1], key[2]) not in seen:
+                seen.add((key[1], key[2]))
+                candidates.append(key)
+
+        results = [
+            {"text": self._names[key[2]], "type": "server", "id": key[2]}
+            if key[1] == "server"
+            else {"text": key[2], "type": "tag", "id": None}
+            for key in heapq.nlargest(
+                limit, candidates, key=lambda key: (self._weight(key), -len(key[0]))
+            )
+        ]
+        self._cache[cache_key] = results
+        if len(self._cache) > MAX_CACHED_PREFIXES:
+            self._cache.popitem(last=False)
+        return results
+
+
+suggest_index = SuggestIndex()
+_refresh_lock = asyncio.Lock()
+
+
+async def refresh_weights() -> None:
+    """从在线人数排序集合读取各服务器的人气权重，超过刷新间隔时才读取"""
+    async with _refresh_lock:
+        if (
+            time.monotonic() - suggest_index.weights_refreshed_at
+            < WEIGHT_REFRESH_INTERVAL
+        ):
+            return
+        scores = await redis_client.zrange(
+            rank_key("players", "all"), 0, -1, withscores=True
+        )
+        suggest_index.set_players(
+            {int(server_id): max(int(score), 0) for server_id, score in scores}
+        )
+
+
+async def SuggestServers(query: str, limit: int) -> list[dict]:
+    """搜索框联想，只使用进程内索引"""
+    if time.monotonic() - suggest_index.weights_refreshed_at >= WEIGHT_REFRESH_INTERVAL:
+        await refresh_weights()
+    return suggest_index.suggest(query, limit)
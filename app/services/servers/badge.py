@@ -0,0 +1,75 @@
+import asyncio
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from app.services.servers.cache import get_cached_status, get_status_fingerprint
+from app.services.servers.ranking import server_exists
+
+# 进程内缓存的徽章数量上限
+MAX_BADGES = 4096
+
+LABEL = "在线"
+ONLINE_COLOR = "#4c1"
+OFFLINE_COLOR = "#9f9f9f"
+
+# (server_id, 状态指纹) -> SVG
+_badges: OrderedDict[tuple[int, str], bytes] = OrderedDict()
+
+
+def _text_width(text: str) -> int:
+    """估算 11px Verdana 下文字的宽度，CJK 字符按全角计算"""
+    return sum(11 if ord(char) >= 0x2E80 else 7 for char in text)
+
+
+def render_badge(label: str, message: str, color: str) -> bytes:
+    """渲染 flat 风格的 SVG 徽章"""
+    label_width = _text_width(label) + 10
+    message_width = _text_width(message) + 10
+    width = label_width + message_width
+    label, message = escape(label), escape(message)
+    return f"""<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="20" role="img" aria-label="{label}: {message}">
+<title>{label}: {message}</title>
+<linearGradient id="s" x2="0" y2="100%"><stop offset="0" stop-color="#bbb" stop-opacity=".1"/><stop offset="1" stop-opacity=".1"/></linearGradient>
+<clipPath id="r"><rect width="{width}" height="20" rx="3" fill="#fff"/></clipPath>
+<g clip-path="url(#r)"><rect width="{label_width}" height="20" fill="#555"/><rect x="{label_width}" width="{message_width}" height="20" fill="{color}"/><rect width="{width}" height="20" fill="url(#s)"/></g>
+<g fill="#fff" text-anchor="middle" font-family="Verdana,Geneva,DejaVu Sans,sans-serif" font-size="11">
+<text x="{label_width / 2}" y="15" fill="#010101" fill-opacity=".3">{label}</text><text x="{label_width / 2}" y="14">{label}</text>
+<text x="{label_width + message_width / 2}" y="15" fill="#010101" fill-opacity=".3">{message}</text><text x="{label_width + message_width / 2}" y="14">{message}</text>
+</g>
+</svg>""".encode()
+
+
+async def get_badge_fingerprint(server_id: int) -> str | None:
+    """
+    获取服务器徽章对应的状态指纹，只访问 Redis。
+
+    :return: 状态指纹，从未记录过状态时为空字符串，服务器不存在时为 None
+    """
+    exists, fingerprint = await asyncio.gather(
+        server_exists(server_id), get_status_fingerprint(server_id)
+    )
+    if not exists:
+        return None
+    return fingerprint or ""
+
+
+async def get_badge(server_id: int, fingerprint: str) -> bytes:
+    """获取服务器状态徽章，按服务器和状态指纹缓存"""
+    key = (server_id, fingerprint)
+    if (badge := _badges.get(key)) is not None:
+        _badges.move_to_end(key)
+        return badge
+
+    stat_data = await get_cached_status(server_id) if fingerprint else None
+    if stat_data:
+        players = stat_data["players"]
+        badge = render_badge(
+            LABEL, f"{players['online']}/{players['max']}", ONLINE_COLOR
+        )
+    else:
+        badge = render_badge(LABEL, "离线", OFFLINE_COLOR)
+
+    _badges[key] = badge
+    if len(_badges) > MAX_BADGES:
+        _badges.popitem(last=False)
+    return badge
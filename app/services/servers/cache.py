@@ -0,0 +1,171 @@
+import hashlib
+import re
+
+import ujson
+
+from app.services.conn.redis import redis_client
+
+# 服务器编辑版本号（hash: server_id -> version）
+SERVER_VERSION_KEY = "servers:version"
+# 服务器最新状态指纹（hash: server_id -> fingerprint）
+STATUS_FINGERPRINT_KEY = "servers:status_fp"
+# 服务器最新状态（hash: server_id -> stat_data JSON），供徽章等不访问数据库的接口使用
+STATUS_KEY = "servers:status"
+# 服务器目录版本号，任一服务器信息或状态变化时递增
+CATALOGUE_VERSION_KEY = "servers:catalogue_version"
+# 服务器变更日志（stream，字段 id 为变化的服务器），条目 ID 即增量同步的 token
+CHANGES_STREAM_KEY = "servers:changes"
+# 变更日志保留的大致条目数，更早的 token 需要全量同步
+CHANGES_MAXLEN = 10000
+# 服务器变更通知频道（pub/sub，消息为变化的服务器 ID），用于向各 worker 推送
+CHANGES_CHANNEL = "servers:changes:live"
+
+# stream 条目 ID：<毫秒>-<序号>，两部分都是 64 位无符号整数
+_STREAM_ID = re.compile(r"([0-9]{1,20})-([0-9]{1,20})")
+
+
+def status_fingerprint(stat_data: dict | None) -> str:
+    """计算服务器状态数据的指纹"""
+    raw = ujson.dumps(stat_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _log_change(pipe, server_id: int) -> None:
+    """在管道中追加一条变更日志并通知各 worker"""
+    pipe.xadd(
+        CHANGES_STREAM_KEY,
+        {"id": str(server_id)},
+        maxlen=CHANGES_MAXLEN,
+        approximate=True,
+    )
+    pipe.publish(CHANGES_CHANNEL, str(server_id))
+
+
+async def bump_server_version(server_id: int) -> None:
+    """服务器信息变更后递增其版本号"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hincrby(SERVER_VERSION_KEY, str(server_id), 1)
+        pipe.incr(CATALOGUE_VERSION_KEY)
+        _log_change(pipe, server_id)
+        await pipe.execute()
+
+
+async def update_status_fingerprint(server_id: int, stat_data: dict | None) -> bool:
+    """
+    记录服务器最新状态指纹。
+
+    :return: 状态是否与上次记录的不同
+    """
+    fingerprint = status_fingerprint(stat_data)
+    raw = ujson.dumps(stat_data, ensure_ascii=False)
+    if await redis_client.hget(STATUS_FINGERPRINT_KEY, str(server_id)) == fingerprint:
+        # 补齐升级前只记录了指纹的服务器
+        await redis_client.hsetnx(STATUS_KEY, str(server_id), raw)
+        return False
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(STATUS_FINGERPRINT_KEY, str(server_id), fingerprint)
+        pipe.hset(STATUS_KEY, str(server_id), raw)
+        pipe.incr(CATALOGUE_VERSION_KEY)
+        _log_change(pipe, server_id)
+        await pipe.execute()
+    return True
+
+
+async def get_catalogue_version() -> str:
+    """获取服务器目录版本号"""
+    return await redis_client.get(CATALOGUE_VERSION_KEY) or "0"
+
+
+async def get_server_tokens(server_ids: list[int]) -> dict[int, str]:
+    """批量获取服务器的版本标识（编辑版本号 + 状态指纹）"""
+    if not server_ids:
+        return {}
+    fields = [str(server_id) for server_id in server_ids]
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hmget(SERVER_VERSION_KEY, fields)
+        pipe.hmget(STATUS_FINGERPRINT_KEY, fields)
+        versions, fingerprints = await pipe.execute()
+    return {
+        server_id: f"{version or 0}:{fingerprint or ''}"
+        for server_id, version, fingerprint in zip(server_ids, versions, fingerprints)
+    }
+
+
+async def get_server_token(server_id: int) -> str:
+    """获取单个服务器的版本标识"""
+    return (await get_server_tokens([server_id]))[server_id]
+
+
+async def read_changes(since: str, count: int) -> tuple[list[int], str, bool] | None:
+    """
+    读取 token 之后的变更日志。
+
+    :param since: 上次同步返回的 token（stream 条目 ID）
+    :param count: 最多读取的条目数
+    :return: (变化的服务器 ID, 新 token, 是否还有更多)，token 已超出保留范围时返回 None
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.xrange(CHANGES_STREAM_KEY, count=1)
+        pipe.xrange(CHANGES_STREAM_KEY, min=f"({since}", count=count + 1)
+        oldest, entries = await pipe.execute()
+
+    # 早于最旧条目的 token 之后可能有已被裁剪的变更
+    if not oldest or _stream_id(since) < _stream_id(oldest[0][0]):
+        return None
+
+    has_more = len(entries) > count
+    entries = entries[:count]
+    server_ids = list(
+        dict.fromkeys(int(fields["id"]) for _, fields in entries if fields["id"] != "0")
+    )
+    return server_ids, entries[-1][0] if entries else since, has_more
+
+
+async def get_changes_token() -> str:
+    """获取当前最新的变更 token"""
+    latest = await redis_client.xrevrange(CHANGES_STREAM_KEY, count=1)
+    if latest:
+        return latest[0][0]
+    # 日志为空时写入占位条目（id 为 0），使返回的 token 位于保留范围内
+    return await redis_client.xadd(
+        CHANGES_STREAM_KEY, {"id": "0"}, maxlen=CHANGES_MAXLEN, approximate=True
+    )
+
+
+def _stream_id(entry_id: str) -> tuple[int, int]:
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def is_valid_token(token: str) -> bool:
+    """检查 token 是否为 Redis 能接受的完整 stream 条目 ID"""
+    if (match := _STREAM_ID.fullmatch(token)) is None:
+        return False
+    stream_id = tuple(int(part) for part in match.groups())
+    if max(stream_id) >= 2**64:
+        return False
+    # 最大 ID 之后没有条目，Redis 不接受以它开始的开区间
+    return stream_id != (2**64 - 1, 2**64 - 1)
+
+
+async def get_cached_status(server_id: int) -> dict | None:
+    """从 Redis 读取服务器最新状态，没有记录或离线时为 None"""
+    raw = await redis_client.hget(STATUS_KEY, str(server_id))
+    return ujson.loads(raw) if raw else None
+
+
+async def get_cached_statuses(server_ids: list[int]) -> dict[int, dict | None]:
+    """一次读取多个服务器的最新状态，没有记录或离线时为 None"""
+    if not server_ids:
+        return {}
+    raws = await redis_client.hmget(STATUS_KEY, [str(i) for i in server_ids])
+    return {
+        server_id: ujson.loads(raw) if raw else None
+        for server_id, raw in zip(server_ids, raws)
+    }
+
+
+async def get_status_fingerprint(server_id: int) -> str | None:
+    """获取服务器最新状态指纹，从未记录过状态时为 None"""
+    return await redis_client.hget(STATUS_FINGERPRINT_KEY, str(server_id))
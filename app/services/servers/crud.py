@@ -1,32 +1,70 @@
 import asyncio
 import random
+from collections.abc import AsyncIterator
+from datetime import datetime
 
 from fastapi import HTTPException, UploadFile, status
+from tortoise import timezone
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+from tortoise.signals import post_delete
 
 from app.models import (
+    AuthModeEnum,
+    DeletedServer,
     Gallery,
     GalleryImage,
     RoleEnum,
     SerRoleEnum,
     Server,
+    ServerLog,
     ServerStatus,
     User,
     UserServer,
 )
 from app.services.auth.schemas import JWTData
+from app.services.search.facets import facet_index
+from app.services.servers.cache import (
+    bump_server_version,
+    get_changes_token,
+    read_changes,
+)
+from app.services.servers.fragments import (
+    FULL_VIEW,
+    Projection,
+    ServerFragment,
+    dumps,
+    get_fragments,
+    render,
+)
 from app.services.servers.schemas import (
     GallerySchema,
     GetServerManagers,
     GetServerStatusAPI,
     Motd,
     ServerDetail,
+    ServerFacets,
     ServerFilter,
     ServerGallery,
-    ServerList,
+    ServerTagFacets,
     ServerTotalPlayers,
     UpdateServerRequest,
     UserBase,
 )
+from app.services.servers.icons import icon_hash, icon_url
+from app.services.servers.pagination import decode_cursor, encode_cursor
+from app.services.servers.ranking import (
+    RANK_SORTS,
+    get_online_ids,
+    get_ranked_ids,
+    rank_scope,
+    update_server_rank,
+)
+from app.services.servers.tags import (
+    count_tags,
+    find_servers_by_tags,
+    sync_server_tags,
+)
 from app.services.servers.utils import (
     get_server_cover_url,
     get_server_gallerys_urls,
@@ -39,73 +77,154 @@ from app.services.servers.utils import (
     validate_tags,
     validate_version,
 )
+from app.services.user.permissions import GUEST, get_user_permissions
 from app.services.user.utils import get_user_avatar_url
 
-# 简单的内存缓存用于减少重复查询
-_server_cache = {}
-_cache_ttl = 60  # 缓存60秒
 
+async def _filter_query(filter: ServerFilter) -> QuerySet[Server] | None:
+    """按筛选条件构建服务器查询，确定没有结果时返回 None"""
+    query = Server.all()
 
-def _get_cache_key(prefix: str, *args) -> str:
-    """生成缓存键"""
-    return f"{prefix}:{':'.join(str(arg) for arg in args)}"
+    # 应用过滤条件
+    if filter.is_member:
+        query = query.filter(is_member=filter.is_member)
 
+    if filter.modes:
+        query = query.filter(type=filter.modes)
 
-def _is_cache_valid(timestamp: float) -> bool:
-    """检查缓存是否有效"""
-    import time
+    if filter.authModes:
+        query = query.filter(auth_mode__in=filter.authModes)
 
-    return time.time() - timestamp < _cache_ttl
+    if filter.tags:
+        # 通过标签倒排索引筛选，避免对 JSON 字段逐行扫描
+        tagged_ids = await find_servers_by_tags(
+            filter.tags, match_all=filter.tag_mode == "all"
+        )
+        if not tagged_ids:
+            return None
+        query = query.filter(id__in=tagged_ids)
 
+    return query
 
-def _get_cached_data(key: str):
-    """获取缓存数据"""
-    if key in _server_cache:
-        data, timestamp = _server_cache[key]
-        if _is_cache_valid(timestamp):
-            return data
-        else:
-            del _server_cache[key]
-    return None
 
+async def _filter_server_ids(filter: ServerFilter) -> list[int]:
+    """按筛选条件查询服务器 ID（按 ID 升序）"""
+    query = await _filter_query(filter)
+    if query is None:
+        return []
+    return list(await query.order_by("id").values_list("id", flat=True))
 
-def _set_cached_data(key: str, data):
-    """设置缓存数据"""
-    import time
 
-    _server_cache[key] = (data, time.time())
+async def GetServerIds(filter: ServerFilter) -> set[int]:
+    """按筛选条件获取服务器 ID 集合"""
+    return set(await _filter_server_ids(filter))
 
 
-# 性能优化: 添加数据库查询缓存清理函数
-def clear_server_cache():
-    """清理服务器缓存"""
-    global _server_cache
-    _server_cache.clear()
+async def _page_by_default(
+    filter: ServerFilter,
+    limit: int | None,
+    offset: int,
+    is_random: bool,
+    seed: int | None,
+    cursor: str | None,
+    projection: Projection,
+) -> tuple[list[int], dict[int, ServerFragment], int, int | None, str | None]:
+    """默认排序（随机或按 ID，有状态的服务器在前）的一页，游标记录种子和位置"""
+    if cursor:
+        position = decode_cursor(cursor, "default")
+        seed, offset = position.seed, position.pos
+        is_random = seed is not None
+
+    server_ids = await _filter_server_ids(filter)
 
+    # 随机排序
+    if is_random:
+        if seed is None:
+            seed = random.randint(0, 2**32 - 1)
+        random.Random(seed).shuffle(server_ids)
+
+    fragments = await get_fragments(server_ids, projection=projection)
+
+    # 根据状态排序（稳定排序，有状态的服务器在前）
+    ordered = sorted(
+        (server_id for server_id in server_ids if server_id in fragments),
+        key=lambda server_id: not fragments[server_id].online,
+    )
+    total = len(ordered)
 
-# 性能优化: 批量预热缓存
-async def warmup_cache(server_ids: list[int]):
-    """预热服务器缓存"""
-    servers = await Server.filter(id__in=server_ids).prefetch_related("cover_hash")
-    statuses = (
-        await ServerStatus.filter(server_id__in=server_ids)
-        .order_by("-timestamp")
-        .prefetch_related("server")
+    # 应用分页
+    end = total if limit is None else offset + limit
+    next_cursor = (
+        encode_cursor("default", seed=seed if is_random else None, pos=end)
+        if end < total
+        else None
     )
+    return ordered[offset:end], fragments, total, seed, next_cursor
+
 
-    # 为每个服务器创建状态映射
-    status_map = {}
-    for server_status in statuses:
-        # 使用预加载的 server 关系
-        server_id = server_status.server.id
-        if server_id not in status_map:
-            status_map[server_id] = server_status
+async def _page_by_name(
+    filter: ServerFilter,
+    limit: int | None,
+    offset: int,
+    cursor: str | None,
+    projection: Projection,
+) -> tuple[list[int], dict[int, ServerFragment], int, str | None]:
+    """按名称排序的一页，游标记录上一页最后一条的 (name, id)，每页只查询一页数据"""
+    query = await _filter_query(filter)
+    if query is None:
+        return [], {}, 0, None
+    total = await query.count()
+
+    if cursor:
+        name, last_id = decode_cursor(cursor, "name").key
+        query = query.filter(Q(name__gt=name) | Q(name=name, id__gt=last_id))
+    elif offset:
+        query = query.offset(offset)
+
+    query = query.order_by("name", "id")
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = await query.values_list("id", "name")
 
-    # 缓存数据
-    for server in servers:
-        cache_key = _get_cache_key("server_basic", server.id)
-        server_status = status_map.get(server.id)
-        _set_cached_data(cache_key, (server, server_status))
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("name", key=[rows[-1][1], rows[-1][0]])
+
+    page = [server_id for server_id, _ in rows]
+    return page, await get_fragments(page, projection=projection), total, next_cursor
+
+
+async def _page_by_rank(
+    filter: ServerFilter,
+    sort: str,
+    limit: int | None,
+    offset: int,
+    cursor: str | None,
+    projection: Projection,
+) -> tuple[list[int], dict[int, ServerFragment], int, str | None]:
+    """按预计算排序集合（人数、延迟、在线时长、收录时间）排序的一页，游标记录位置"""
+    if cursor:
+        offset = decode_cursor(cursor, sort).pos
+    scope = rank_scope(filter.is_member, filter.modes)
+
+    # 排序集合已按成员和类型划分，标签和认证模式需要额外筛选
+    if filter.tags or not set(filter.authModes) >= {
+        mode.value for mode in AuthModeEnum
+    }:
+        allowed = set(await _filter_server_ids(filter))
+        ranked, _ = await get_ranked_ids(sort, scope)
+        ranked = [server_id for server_id in ranked if server_id in allowed]
+        total = len(ranked)
+        end = total if limit is None else offset + limit
+        page = ranked[offset:end]
+    else:
+        stop = -1 if limit is None else offset + limit - 1
+        page, total = await get_ranked_ids(sort, scope, offset, stop)
+        end = offset + len(page)
+
+    next_cursor = encode_cursor(sort, pos=end) if end < total else None
+    return page, await get_fragments(page, projection=projection), total, next_cursor
 
 
 async def GetServers(
@@ -115,214 +234,282 @@ async def GetServers(
     is_random: bool = True,
     seed: int | None = None,
     user: int | None = None,
-) -> ServerList:
-    # 并发查询服务器总数和成员数
+    projection: Projection = FULL_VIEW,
+    sort: str = "default",
+    cursor: str | None = None,
+) -> bytes:
+    """获取服务器列表，返回 ServerList 结构的 JSON 字节串（卡片按 projection 裁剪）"""
     total_member_task = Server.filter(is_member=True).count()
 
-    # 构建查询，预取相关数据以减少查询次数
-    query = Server.all().prefetch_related("cover_hash")
+    if sort == "name":
+        (
+            (page, fragments, total_servers, next_cursor),
+            total_member,
+        ) = await asyncio.gather(
+            _page_by_name(filter, limit, offset, cursor, projection),
+            total_member_task,
+        )
+        seed = None
+    elif sort in RANK_SORTS:
+        (
+            (page, fragments, total_servers, next_cursor),
+            total_member,
+        ) = await asyncio.gather(
+            _page_by_rank(filter, sort, limit, offset, cursor, projection),
+            total_member_task,
+        )
+        seed = None
+    else:
+        (
+            (page, fragments, total_servers, seed, next_cursor),
+            total_member,
+        ) = await asyncio.gather(
+            _page_by_default(
+                filter, limit, offset, is_random, seed, cursor, projection
+            ),
+            total_member_task,
+        )
+    page = [server_id for server_id in page if server_id in fragments]
 
-    # 应用过滤条件
-    if filter.is_member:
-        query = query.filter(is_member=filter.is_member)
+    # 叠加用户权限
+    permissions = (
+        await get_user_permissions(user) if "permission" in projection else GUEST
+    )
+    server_list = b",".join(
+        render(fragments[server_id], permissions.resolve(server_id), projection)
+        for server_id in page
+    )
 
-    if filter.modes:
-        query = query.filter(type=filter.modes)
+    return b"".join(
+        (
+            b'{"server_list":[',
+            server_list,
+            b'],"total_member":',
+            dumps(total_member),
+            b',"total":',
+            dumps(total_servers),
+            b',"random_seed":',
+            dumps(seed),
+            b',"next_cursor":',
+            dumps(next_cursor),
+            b"}",
+        )
+    )
 
-    if filter.authModes:
-        query = query.filter(auth_mode__in=filter.authModes)
 
-    if filter.tags:
-        # 对标签进行过滤 (标签是数组字段，需要特殊处理)
-        # 这里假设tags字段是JSON数组，查询包含任意指定标签的服务器
-        for tag in filter.tags:
-            query = query.filter(tags__contains=tag)
+async def GetTagFacets(filter: ServerFilter) -> ServerTagFacets:
+    """统计筛选条件下各标签的服务器数量"""
+    unfiltered = (
+        not filter.is_member
+        and not filter.modes
+        and not filter.tags
+        and set(filter.authModes) >= {mode.value for mode in AuthModeEnum}
+    )
+    server_ids = None if unfiltered else await _filter_server_ids(filter)
+    return ServerTagFacets(tags=await count_tags(server_ids))
 
-    # 并发获取过滤后的服务器和成员总数
-    all_servers, total_member = await asyncio.gather(query, total_member_task)
 
-    # 随机排序
-    if is_random:
-        if seed is None:
-            seed = random.randint(0, 2**32 - 1)
-        random.seed(seed)
-        random.shuffle(all_servers)
-
-    # 批量获取用户权限信息和服务器状态
-    user_servers_map = {}
-    user_info = None
-    server_statuses_map = {}
-
-    if user:
-        user_info = await User.get_or_none(id=user)
-        server_ids = [server.id for server in all_servers]
-        user_servers = await UserServer.filter(
-            user=user, server_id__in=server_ids
-        ).prefetch_related("server")
-        user_servers_map = {us.server.id: us.role for us in user_servers}
-
-    # 批量获取服务器状态
-    if all_servers:
-        server_ids = [server.id for server in all_servers]
-        server_statuses = (
-            await ServerStatus.filter(server_id__in=server_ids)
-            .prefetch_related("server")
-            .order_by("-timestamp")
-        )
-        # 创建服务器ID到最新状态的映射
-        for status in server_statuses:
-            if status.server.id not in server_statuses_map:
-                server_statuses_map[status.server.id] = status
-
-    # 批量处理服务器详情，避免N+1查询
-    server_list = []
-    cover_url_tasks = []
-
-    for server in all_servers:
-        # 确定用户权限
-        permission = (
-            SerRoleEnum.owner
-            if user_info and user_info.role == "admin"
-            else user_servers_map.get(server.id, "guest")
+async def GetServerFacets(filter: ServerFilter, online: bool = False) -> ServerFacets:
+    """
+    统计筛选条件下各标签、类型、认证模式和版本的服务器数量，只使用进程内分面索引。
+
+    :param online: 是否只统计当前在线的服务器
+    """
+    if not facet_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="统计尚未就绪"
         )
 
-        # 处理服务器状态
-        status_data = None
-        server_status = server_statuses_map.get(server.id)
-        if server_status and server_status.stat_data:
-            stat_data = server_status.stat_data
-            status_data = GetServerStatusAPI(
-                players=stat_data["players"],
-                delay=stat_data["delay"],
-                version=stat_data["version"],
-                motd=Motd(
-                    plain=stat_data["motd"]["plain"],
-                    html=stat_data["motd"]["html"],
-                    minecraft=stat_data["motd"]["minecraft"],
-                    ansi=stat_data["motd"]["ansi"],
-                ),
-                icon=stat_data["icon"],
-            )
+    # None 表示不限制
+    server_ids: set[int] | None = None
 
-        # 准备封面URL任务
-        cover_url_tasks.append(get_server_cover_url(server))
-
-        server_detail = ServerDetail(
-            id=server.id,
-            name=server.name,
-            ip=None if server.is_hide else server.ip,
-            type=server.type,
-            version=server.version,
-            desc=server.desc,
-            link=server.link,
-            is_member=server.is_member,
-            auth_mode=server.auth_mode,
-            tags=server.tags,
-            is_hide=server.is_hide,
-            status=status_data,
-            permission=permission,
-            cover_url=None,  # 稍后批量设置
-        )
-        server_list.append(server_detail)
+    def narrow(ids: set[int]) -> None:
+        nonlocal server_ids
+        server_ids = set(ids) if server_ids is None else server_ids & ids
 
-    # 批量获取封面URL
-    if cover_url_tasks:
-        cover_urls = await asyncio.gather(*cover_url_tasks)
-        for i, cover_url in enumerate(cover_urls):
-            server_list[i].cover_url = cover_url
+    if filter.is_member:
+        narrow(facet_index.members)
+    if filter.modes:
+        narrow(facet_index.lookup("type", filter.modes))
+    if not set(filter.authModes) >= {mode.value for mode in AuthModeEnum}:
+        narrow(
+            set().union(
+                *(facet_index.lookup("auth_mode", mode) for mode in filter.authModes)
+            )
+        )
+    if filter.tags:
+        tagged = [facet_index.lookup("tags", tag) for tag in filter.tags]
+        narrow(
+            set.intersection(*tagged)
+            if filter.tag_mode == "all"
+            else set().union(*tagged)
+        )
+    if online:
+        narrow(await get_online_ids())
+
+    total = len(facet_index.server_ids if server_ids is None else server_ids)
+    return ServerFacets(total=total, **facet_index.count(server_ids))
+
+
+async def GetServers_by_ids(
+    server_ids: list[int],
+    user: int | None,
+    tokens: dict[int, str] | None = None,
+    projection: Projection = FULL_VIEW,
+) -> bytes:
+    """批量获取服务器信息，返回 ServerBatch 结构的 JSON 字节串"""
+    server_ids = list(dict.fromkeys(server_ids))  # 去重并保持顺序
+    fragments = await get_fragments(server_ids, tokens, projection)
+    found = [server_id for server_id in server_ids if server_id in fragments]
+
+    permissions = (
+        await get_user_permissions(user) if "permission" in projection else GUEST
+    )
+    server_list = b",".join(
+        render(fragments[server_id], permissions.resolve(server_id), projection)
+        for server_id in found
+    )
+    missing = [server_id for server_id in server_ids if server_id not in fragments]
 
-    total_servers = len(server_list)
+    return b"".join(
+        (b'{"server_list":[', server_list, b'],"missing":', dumps(missing), b"}")
+    )
 
-    # 根据状态排序
-    server_list.sort(key=lambda x: x.status is None)
 
-    # 应用分页
-    server_list = server_list[offset:]
-    if limit is not None:
-        server_list = server_list[:limit]
+# 单次增量同步最多读取的变更日志条目数
+MAX_CHANGES = 500
+
+
+async def GetServerChanges(
+    since: str | None, user: int | None, projection: Projection = FULL_VIEW
+) -> bytes:
+    """获取 token 之后有变化的服务器，返回 ServerChanges 结构的 JSON 字节串"""
+    changes = await read_changes(since, MAX_CHANGES) if since else None
+    if changes is None:
+        # 首次同步或 token 过旧，客户端应先记下 token 再拉取完整列表
+        return dumps(
+            {
+                "token": await get_changes_token(),
+                "resync": True,
+                "has_more": False,
+                "server_list": [],
+                "deleted": [],
+            }
+        )
 
-    return ServerList(
-        server_list=server_list,
-        total_member=total_member,
-        total=total_servers,
-        random_seed=seed,
+    server_ids, token, has_more = changes
+    fragments = await get_fragments(server_ids, projection=projection)
+    permissions = (
+        await get_user_permissions(user) if "permission" in projection else GUEST
+    )
+    server_list = b",".join(
+        render(fragments[server_id], permissions.resolve(server_id), projection)
+        for server_id in server_ids
+        if server_id in fragments
+    )
+    deleted = [server_id for server_id in server_ids if server_id not in fragments]
+
+    return b"".join(
+        (
+            b'{"token":',
+            dumps(token),
+            b',"resync":false,"has_more":',
+            dumps(has_more),
+            b',"server_list":[',
+            server_list,
+            b'],"deleted":',
+            dumps(deleted),
+            b"}",
+        )
     )
 
 
-# 2. GetServer_by_id 返回 ServerDetail
-async def GetServer_by_id(server_id: int, user: int | None) -> None | ServerDetail:
-    # 检查缓存（仅对没有用户特定信息的基础数据进行缓存）
-    cache_key = _get_cache_key("server_basic", server_id)
+# 2. GetServer_by_id 返回 ServerDetail 结构的 JSON 字节串
+async def GetServer_by_id(
+    server_id: int,
+    user: int | None,
+    version: str | None = None,
+    projection: Projection = FULL_VIEW,
+) -> bytes | None:
+    tokens = {server_id: version} if version is not None else None
+    fragment = (await get_fragments([server_id], tokens, projection)).get(server_id)
+    if fragment is None:
+        return None
+
+    permissions = (
+        await get_user_permissions(user) if "permission" in projection else GUEST
+    )
+    return render(fragment, permissions.resolve(server_id), projection)
 
-    if cached_server_data := _get_cached_data(cache_key):
-        server, server_status = cached_server_data
-    else:
-        # 查询服务器是否存在，预取封面信息
-        server = await Server.get_or_none(id=server_id).prefetch_related("cover_hash")
-        if not server:
-            return None
 
-        # 获取最新的服务器状态
-        server_status = (
-            await ServerStatus.filter(server=server).order_by("-timestamp").first()
-        )
+# 导出时每批读取的服务器数量，限制单次请求占用的内存
+EXPORT_CHUNK_SIZE = 200
 
-        # 缓存基础数据（不包含用户相关信息）
-        _set_cached_data(cache_key, (server, server_status))
 
-    # 用户相关查询不缓存，因为是用户特定的
-    user_server_task = (
-        UserServer.get_or_none(user=user, server=server_id)
-        if user
-        else asyncio.sleep(0, result=None)
+@post_delete(Server)
+async def _on_server_deleted(sender, instance: Server, *args) -> None:
+    await DeletedServer.update_or_create(
+        {"deleted_at": timezone.now()}, server_id=instance.id
     )
-    user_info_task = (
-        User.get_or_none(id=user) if user else asyncio.sleep(0, result=None)
-    )
-    cover_task = get_server_cover_url(server)
 
-    user_server, user_info, cover_url = await asyncio.gather(
-        user_server_task, user_info_task, cover_task
-    )
 
-    permission = (
-        SerRoleEnum.owner
-        if user_info and user_info.role == "admin"
-        else (user_server.role if user_server else "guest")
+async def _changed_server_ids(since: datetime) -> tuple[set[int], list[int]]:
+    """
+    查询指定时间后有变化的服务器。
+
+    :return: (新建、状态更新或信息被编辑过的服务器, 已删除的服务器)
+    """
+    if timezone.is_aware(since):
+        since = timezone.make_naive(since)
+    created_ids, status_ids, edited_ids, deleted_ids = await asyncio.gather(
+        Server.filter(created_at__gt=since).values_list("id", flat=True),
+        ServerStatus.filter(updated_at__gt=since).values_list("server_id", flat=True),
+        ServerLog.filter(created_at__gt=since).values_list("server_id", flat=True),
+        DeletedServer.filter(deleted_at__gt=since)
+        .order_by("server_id")
+        .values_list("server_id", flat=True),
     )
-
-    status_data = None
-    if server_status and server_status.stat_data:
-        stat_data = server_status.stat_data
-        status_data = GetServerStatusAPI(
-            players=stat_data["players"],
-            delay=stat_data["delay"],
-            version=stat_data["version"],
-            motd=Motd(
-                plain=stat_data["motd"]["plain"],
-                html=stat_data["motd"]["html"],
-                minecraft=stat_data["motd"]["minecraft"],
-                ansi=stat_data["motd"]["ansi"],
-            ),
-            icon=stat_data["icon"],
+    return set(created_ids) | set(status_ids) | set(edited_ids), list(deleted_ids)
+
+
+async def ExportServers(since: datetime | None = None) -> AsyncIterator[bytes]:
+    """
+    按 ID 分批导出服务器卡片（含最新状态，不含 permission），每行一个 JSON 对象。
+
+    增量导出时，最后按 ID 输出之后被删除的服务器，每行为 {"id": N, "deleted": true}。
+
+    :param since: 只导出该时间之后有变化的服务器，为 None 时导出全部
+    """
+    query = Server.all()
+    deleted_ids: list[int] = []
+    if since is not None:
+        changed_ids, deleted_ids = await _changed_server_ids(since)
+        query = query.filter(id__in=changed_ids)
+
+    last_id = 0
+    while since is None or changed_ids:
+        server_ids = list(
+            await query.filter(id__gt=last_id)
+            .order_by("id")
+            .limit(EXPORT_CHUNK_SIZE)
+            .values_list("id", flat=True)
         )
+        if not server_ids:
+            break
+        # 片段本身不含 permission，直接复用列表接口的缓存
+        fragments = await get_fragments(server_ids)
+        yield b"".join(
+            fragments[server_id].data + b"\n"
+            for server_id in server_ids
+            if server_id in fragments
+        )
+        last_id = server_ids[-1]
 
-    return ServerDetail(
-        id=server.id,
-        name=server.name,
-        ip=None if server.is_hide else server.ip,
-        type=server.type,
-        version=server.version,
-        desc=server.desc,
-        link=server.link,
-        is_member=server.is_member,
-        auth_mode=server.auth_mode,
-        tags=server.tags,
-        is_hide=server.is_hide,
-        status=status_data,
-        permission=permission,
-        cover_url=cover_url,
-    )
+    for start in range(0, len(deleted_ids), EXPORT_CHUNK_SIZE):
+        yield b"".join(
+            dumps({"id": server_id, "deleted": True}) + b"\n"
+            for server_id in deleted_ids[start : start + EXPORT_CHUNK_SIZE]
+        )
 
 
 # 3. GetServer_by_id_editor 返回 ServerDetail
@@ -367,6 +554,7 @@ async def GetServer_by_id_editor(server_id: int, current_user) -> ServerDetail |
     status_data = None
     if server_status and server_status.stat_data:
         stat_data = server_status.stat_data
+        digest = icon_hash(stat_data["icon"])
         status_data = GetServerStatusAPI(
             players=stat_data["players"],
             delay=stat_data["delay"],
@@ -377,7 +565,8 @@ async def GetServer_by_id_editor(server_id: int, current_user) -> ServerDetail |
                 minecraft=stat_data["motd"]["minecraft"],
                 ansi=stat_data["motd"]["ansi"],
             ),
-            icon=stat_data["icon"],
+            icon=icon_url(server.id, digest),
+            icon_hash=digest,
         )
 
     return ServerDetail(
@@ -488,6 +677,7 @@ async def AddGalleryImage(server_id, gallery_data: GallerySchema) -> None:
         image_hash=image_hash,
         gallery=await server.gallery,
     )
+    await bump_server_version(server.id)
 
 
 async def RemoveGalleryImage(server_id: int, image_id: int) -> None:
@@ -516,6 +706,7 @@ async def RemoveGalleryImage(server_id: int, image_id: int) -> None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="图片不存在")
 
     await image.delete()
+    await bump_server_version(server.id)
 
 
 # 获取所有服务器的玩家总和
@@ -571,4 +762,11 @@ async def update_server_by_id(
     server.version = update_data.version
     server.link = update_data.link
     await server.save_with_user(await User.get(id=current_user.id))
+    await sync_server_tags(server.id, server.tags)
+    stat_data = (
+        await ServerStatus.filter(server=server)
+        .first()
+        .values_list("stat_data", flat=True)
+    )
+    await update_server_rank(server.id, server.is_member, server.type, stat_data)
     return await GetServer_by_id_editor(server_id, current_user)
@@ -0,0 +1,249 @@
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import ujson
+from fastapi import HTTPException, status
+
+from app.models import Server, ServerStatus
+from app.services.servers.cache import get_server_tokens
+from app.services.servers.icons import icon_hash, icon_url
+
+# 片段最长存活时间（秒），兜底绕过版本号直接修改数据库的情况
+FRAGMENT_TTL = 300
+# 同时缓存的字段投影种类上限
+MAX_PROJECTIONS = 16
+
+# ServerDetail 的字段（按输出顺序），permission 由请求时叠加
+CARD_FIELDS = (
+    "id",
+    "name",
+    "ip",
+    "type",
+    "version",
+    "desc",
+    "link",
+    "is_member",
+    "auth_mode",
+    "tags",
+    "is_hide",
+    "status",
+    "permission",
+    "cover_url",
+)
+# GetServerStatusAPI 的字段，可通过 status.<字段> 单独选择
+STATUS_FIELDS = ("players", "delay", "version", "motd", "icon", "icon_hash")
+
+# 字段投影，元素为 CARD_FIELDS 中的字段或 status.<字段>
+Projection = tuple[str, ...]
+
+FULL_VIEW: Projection = CARD_FIELDS
+# 精简视图：列表卡片、轮播图等只需要名称、人数和封面
+LITE_VIEW: Projection = (
+    "id",
+    "name",
+    "type",
+    "is_member",
+    "tags",
+    "status.players",
+    "status.delay",
+    "cover_url",
+)
+VIEWS: dict[str, Projection] = {"full": FULL_VIEW, "lite": LITE_VIEW}
+
+
+class ServerFragment(NamedTuple):
+    """预序列化的服务器卡片（不含 permission）"""
+
+    token: str  # 构建时的服务器版本标识
+    built_at: float  # 构建时间
+    online: bool  # 是否有状态数据
+    data: bytes  # JSON 对象字节串
+
+
+# 进程内片段缓存 projection -> server_id -> ServerFragment
+_fragments: OrderedDict[Projection, dict[int, ServerFragment]] = OrderedDict()
+
+
+def dumps(obj) -> bytes:
+    """序列化为 JSON 字节串"""
+    return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode(
+        "utf-8"
+    )
+
+
+def parse_projection(fields: str | None, view: str = "full") -> Projection:
+    """
+    解析 fields / view 参数为规范化的字段投影。
+
+    :param fields: 逗号分隔的字段列表，例如 "name,status.players"，优先于 view
+    :param view: 预设视图 lite / full
+    """
+    if not fields:
+        if view not in VIEWS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="view 不合法"
+            )
+        return VIEWS[view]
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    for field in requested:
+        parent, _, child = field.partition(".")
+        if parent not in CARD_FIELDS or (
+            child and (parent != "status" or child not in STATUS_FIELDS)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的字段: {field}",
+            )
+    # 选择了整个 status 时忽略其子字段
+    if "status" in requested:
+        requested = {field for field in requested if not field.startswith("status.")}
+    requested.add("id")
+
+    return tuple(
+        field
+        for field in (*CARD_FIELDS, *(f"status.{f}" for f in STATUS_FIELDS))
+        if field in requested
+    )
+
+
+def _status_fields(projection: Projection) -> tuple[str, ...]:
+    """投影中需要的状态字段"""
+    if "status" in projection:
+        return STATUS_FIELDS
+    return tuple(
+        field.removeprefix("status.")
+        for field in projection
+        if field.startswith("status.")
+    )
+
+
+def format_status(stat_data: dict | None, server_id: int) -> dict | None:
+    """将 stat_data 转换为 GetServerStatusAPI 的结构，图标只输出地址和哈希"""
+    if not stat_data:
+        return None
+    motd = stat_data["motd"]
+    digest = icon_hash(stat_data["icon"])
+    return {
+        "players": stat_data["players"],
+        "delay": stat_data["delay"],
+        "version": stat_data["version"],
+        "motd": {
+            "plain": motd["plain"],
+            "html": motd["html"],
+            "minecraft": motd["minecraft"],
+            "ansi": motd["ansi"],
+        },
+        "icon": icon_url(server_id, digest),
+        "icon_hash": digest,
+    }
+
+
+async def _build_fragments(
+    server_ids: list[int],
+    tokens: dict[int, str],
+    projection: Projection,
+    store: dict[int, ServerFragment],
+) -> None:
+    """从数据库批量构建服务器片段，只查询投影需要的列"""
+    columns = {"id"}
+    for field in projection:
+        if field == "ip":
+            columns |= {"ip", "is_hide"}
+        elif field in CARD_FIELDS and field not in (
+            "status",
+            "permission",
+            "cover_url",
+        ):
+            columns.add(field)
+    related = (
+        {"cover_url": "cover_hash__file_path"} if "cover_url" in projection else {}
+    )
+    servers = await Server.filter(id__in=server_ids).values(*columns, **related)
+
+    # 每个服务器只取最新状态，状态数据非空即视为在线（不输出状态时也用于排序）
+    status_fields = _status_fields(projection)
+    status_map: dict[int, dict | None] = {}
+    statuses = (
+        await ServerStatus.filter(server_id__in=server_ids)
+        .order_by("-timestamp")
+        .values("server_id", "stat_data")
+    )
+    for row in statuses:
+        status_map.setdefault(row["server_id"], row["stat_data"])
+    online_ids = {server_id for server_id, data in status_map.items() if data}
+
+    for server_id in server_ids:
+        store.pop(server_id, None)
+
+    now = time.time()
+    for server in servers:
+        status_data = format_status(status_map.get(server["id"]), server["id"])
+        if status_data is not None and "status" not in projection:
+            status_data = {field: status_data[field] for field in status_fields}
+
+        card = {}
+        for field in projection:
+            if field == "ip":
+                card["ip"] = None if server["is_hide"] else server["ip"]
+            elif field == "status":
+                card["status"] = status_data
+            elif field.startswith("status."):
+                card.setdefault("status", status_data)
+            elif field != "permission":
+                card[field] = server[field]
+
+        store[server["id"]] = ServerFragment(
+            token=tokens[server["id"]],
+            built_at=now,
+            online=server["id"] in online_ids,
+            data=dumps(card),
+        )
+
+
+async def get_fragments(
+    server_ids: list[int],
+    tokens: dict[int, str] | None = None,
+    projection: Projection = FULL_VIEW,
+) -> dict[int, ServerFragment]:
+    """
+    批量获取服务器片段，版本变化或过期的片段会被重新构建。
+
+    :param server_ids: 服务器 ID 列表
+    :param tokens: 已获取的服务器版本标识，为 None 时从 Redis 读取
+    :param projection: 字段投影
+    :return: server_id -> ServerFragment，不存在的服务器不会出现在结果中
+    """
+    if tokens is None:
+        tokens = await get_server_tokens(server_ids)
+
+    if projection in _fragments:
+        _fragments.move_to_end(projection)
+    elif len(_fragments) >= MAX_PROJECTIONS:
+        _fragments.popitem(last=False)
+    store = _fragments.setdefault(projection, {})
+
+    now = time.time()
+    stale = [
+        server_id
+        for server_id in server_ids
+        if (fragment := store.get(server_id)) is None
+        or fragment.token != tokens[server_id]
+        or now - fragment.built_at > FRAGMENT_TTL
+    ]
+    if stale:
+        await _build_fragments(stale, tokens, projection, store)
+
+    return {
+        server_id: store[server_id] for server_id in server_ids if server_id in store
+    }
+
+
+def render(
+    fragment: ServerFragment, permission: str | None, projection: Projection = FULL_VIEW
+) -> bytes:
+    """在片段上叠加用户权限，得到输出的 JSON 对象"""
+    if "permission" not in projection:
+        return fragment.data
+    return fragment.data[:-1] + b',"permission":' + dumps(permission) + b"}"
@@ -2,7 +2,11 @@ import asyncio
 import time
 
 from app import logger
+from app.services.search.indexer import record_popularity
+from app.services.servers.cache import update_status_fingerprint
 from app.services.servers.crud import Server, ServerStatus
+from app.services.servers.icons import store_icon
+from app.services.servers.ranking import update_server_rank
 from app.services.servers.stats_utils import get_server_stats
 
 queue = asyncio.Queue()
@@ -41,9 +45,18 @@ async def consumer(worker_id: int):
             )
 
             if should_update:
-                stats, _ = await ServerStatus.get_or_create(server=server)
-                stats.stat_data = new_stats
-                await stats.save()
+                stats, created = await ServerStatus.get_or_create(server=server)
+                # 只在状态确实变化时写入，updated_at 供增量导出判断变化
+                if created or stats.stat_data != new_stats:
+                    stats.stat_data = new_stats
+                    await stats.save()
+                await update_status_fingerprint(server.id, new_stats)
+                online_since = await update_server_rank(
+                    server.id, server.is_member, server.type, new_stats
+                )
+                record_popularity(server.id, new_stats, online_since)
+                if new_stats:
+                    await store_icon(new_stats["icon"])
 
                 # 更新缓存
                 status_cache[server.id] = {"stat_data": new_stats, "timestamp": now}
@@ -0,0 +1,130 @@
+import base64
+import binascii
+import hashlib
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+
+from app.config import settings
+from app.file_storage.conn import session
+from app.log import logger
+from app.services.conn.redis import redis_client
+from app.services.servers.cache import get_cached_status
+
+# 进程内缓存的图标数量上限
+MAX_ICONS = 2048
+# Redis 中图标的有效期（秒），过期后从 S3 读取
+ICON_REDIS_TTL = 7 * 86400
+ICON_PREFIX = "data:image/png;base64,"
+# 图标在 S3 中的目录，按内容哈希命名
+ICON_S3_PREFIX = "icons/"
+
+# 内容哈希 -> PNG
+_icons: OrderedDict[str, bytes] = OrderedDict()
+
+
+def _redis_key(icon_hash: str) -> str:
+    return f"servers:icon:{icon_hash}"
+
+
+def _decode(icon: str) -> bytes | None:
+    """解码 data URI 格式的服务器图标"""
+    # 部分服务端按 76 列换行输出 base64，先去掉其中的空白
+    encoded = "".join(icon.removeprefix(ICON_PREFIX).split())
+    try:
+        return base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def icon_hash(icon: str | None) -> str | None:
+    """计算服务器图标的内容哈希，没有图标时为 None"""
+    if not icon or (data := _decode(icon)) is None:
+        return None
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def icon_url(server_id: int, icon_hash: str | None) -> str | None:
+    """服务器图标的访问地址，哈希变化时地址随之变化"""
+    if icon_hash is None:
+        return None
+    return f"/v1/servers/{server_id}/icon.png?hash={icon_hash}"
+
+
+def _remember(icon_hash: str, data: bytes) -> None:
+    _icons[icon_hash] = data
+    _icons.move_to_end(icon_hash)
+    if len(_icons) > MAX_ICONS:
+        _icons.popitem(last=False)
+
+
+async def store_icon(icon: str | None) -> str | None:
+    """
+    保存服务器图标，首次出现的图标会写入 Redis 并上传到 S3。
+
+    :return: 图标的内容哈希
+    """
+    if not icon or (data := _decode(icon)) is None:
+        return None
+    digest = hashlib.sha256(data).hexdigest()[:32]
+
+    # Redis 中已有说明该图标之前已上传过
+    if await redis_client.set(
+        _redis_key(digest),
+        base64.b64encode(data).decode("ascii"),
+        ex=ICON_REDIS_TTL,
+        nx=True,
+    ):
+        try:
+            async with session.resource(
+                "s3", endpoint_url=settings.S3_ENDPOINT_URL
+            ) as s3:
+                bucket = await s3.Bucket(settings.S3_BUCKET)
+                await bucket.put_object(
+                    Key=f"{ICON_S3_PREFIX}{digest}.png",
+                    Body=data,
+                    ContentType="image/png",
+                    CacheControl=settings.CACHE_CONTROL["server_icon"],
+                )
+        except Exception:
+            # 上传失败时移除标记，下次轮询重试
+            await redis_client.delete(_redis_key(digest))
+            raise
+    return digest
+
+
+async def get_icon(icon_hash: str) -> bytes | None:
+    """依次从进程内缓存、Redis 和 S3 读取图标"""
+    if (data := _icons.get(icon_hash)) is not None:
+        _icons.move_to_end(icon_hash)
+        return data
+
+    if encoded := await redis_client.get(_redis_key(icon_hash)):
+        data = base64.b64decode(encoded)
+    else:
+        try:
+            async with session.resource(
+                "s3", endpoint_url=settings.S3_ENDPOINT_URL
+            ) as s3:
+                obj = await s3.Object(
+                    settings.S3_BUCKET, f"{ICON_S3_PREFIX}{icon_hash}.png"
+                )
+                response = await obj.get()
+                data = await response["Body"].read()
+        except ClientError as e:
+            logger.debug(f"S3 中没有图标 {icon_hash}: {e}")
+            return None
+        await redis_client.set(
+            _redis_key(icon_hash),
+            base64.b64encode(data).decode("ascii"),
+            ex=ICON_REDIS_TTL,
+        )
+
+    _remember(icon_hash, data)
+    return data
+
+
+async def get_current_icon_hash(server_id: int) -> str | None:
+    """从缓存的最新状态计算服务器当前图标的哈希"""
+    stat_data = await get_cached_status(server_id)
+    return icon_hash(stat_data.get("icon")) if stat_data else None
@@ -0,0 +1,226 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from app.log import logger
+from app.services.conn.redis import redis_client
+from app.services.servers.cache import CHANGES_CHANNEL, get_server_tokens
+from app.services.servers.fragments import (
+    MAX_PROJECTIONS,
+    Projection,
+    ServerFragment,
+    get_fragments,
+    render,
+)
+from app.services.user.permissions import GUEST, get_user_permissions
+
+# 同一连接两次推送的最短间隔（秒），间隔内的变化会被合并为一次推送
+PUSH_INTERVAL = 1.0
+# 没有变化时发送心跳的间隔（秒）
+HEARTBEAT_INTERVAL = 15.0
+# 按筛选条件订阅时重新计算服务器范围的间隔（秒）
+SCOPE_REFRESH_INTERVAL = 60.0
+# 每个 worker 允许的最大推送连接数
+MAX_CONNECTIONS = 5000
+
+
+class Subscription:
+    """一个推送连接的订阅状态"""
+
+    def __init__(self, server_ids: set[int] | None) -> None:
+        self.server_ids = server_ids  # 订阅的服务器，None 表示全部
+        self.pending: set[int] = set()  # 待推送的服务器，多次变化自动合并
+        self.event = asyncio.Event()
+
+    def notify(self, server_id: int) -> None:
+        self.pending.add(server_id)
+        self.event.set()
+
+    def drain(self) -> list[int]:
+        """取出待推送的服务器"""
+        server_ids = sorted(self.pending)
+        self.pending.clear()
+        self.event.clear()
+        return server_ids
+
+
+# 本 worker 的订阅：server_id -> 订阅，以及订阅全部服务器的连接
+_by_server: dict[int, set[Subscription]] = {}
+_wildcard: set[Subscription] = set()
+_connections = 0
+# 监听器维护的服务器版本标识，推送连接共用，避免每个连接各自访问 Redis
+_tokens: dict[int, str] = {}
+# 同一投影的片段获取串行执行，并发连接只有第一个会访问 Redis 和数据库
+# 与片段缓存一样最多保留 MAX_PROJECTIONS 种投影
+_build_locks: OrderedDict[Projection, asyncio.Lock] = OrderedDict()
+
+
+def connection_count() -> int:
+    """本 worker 当前的推送连接数"""
+    return _connections
+
+
+def subscribe(server_ids: set[int] | None) -> Subscription:
+    """注册订阅，指定服务器的订阅会先推送一次当前状态"""
+    global _connections
+
+    _connections += 1
+    sub = Subscription(server_ids)
+    if server_ids is None:
+        _wildcard.add(sub)
+        return sub
+    for server_id in server_ids:
+        _by_server.setdefault(server_id, set()).add(sub)
+        sub.notify(server_id)
+    return sub
+
+
+def unsubscribe(sub: Subscription) -> None:
+    global _connections
+
+    _connections -= 1
+    if sub.server_ids is None:
+        _wildcard.discard(sub)
+        return
+    for server_id in sub.server_ids:
+        subs = _by_server.get(server_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _by_server[server_id]
+
+
+def dispatch(server_id: int) -> None:
+    """将服务器变化分发给本 worker 中订阅了它的连接"""
+    for sub in _by_server.get(server_id, ()):
+        sub.notify(server_id)
+    for sub in _wildcard:
+        sub.notify(server_id)
+
+
+async def listen_server_changes() -> None:
+    """订阅 Redis 中的服务器变更通知并分发给本 worker 的连接，每个 worker 运行一个"""
+    while True:
+        pubsub = redis_client.pubsub()
+        # 断线期间可能错过变更，重新订阅后不再信任已记录的版本标识
+        _tokens.clear()
+        try:
+            await pubsub.subscribe(CHANGES_CHANNEL)
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                # 一次取完已到达的通知，整批读取版本标识后再分发
+                changed: set[int] = set()
+                while message is not None:
+                    changed.add(int(message["data"]))
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=0
+                    )
+                if changed:
+                    _tokens.update(await get_server_tokens(sorted(changed)))
+                    for server_id in changed:
+                        dispatch(server_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"服务器变更订阅中断，5 秒后重连: {e}")
+            await asyncio.sleep(5)
+        finally:
+            await pubsub.aclose()
+
+
+def _build_lock(projection: Projection) -> asyncio.Lock:
+    """获取投影的构建锁，超出上限时淘汰最久未使用且空闲的锁"""
+    if (lock := _build_locks.get(projection)) is not None:
+        _build_locks.move_to_end(projection)
+        return lock
+    for idle in [key for key, lock in _build_locks.items() if not lock.locked()]:
+        if len(_build_locks) < MAX_PROJECTIONS:
+            break
+        del _build_locks[idle]
+    lock = _build_locks[projection] = asyncio.Lock()
+    return lock
+
+
+async def _get_fragments(
+    server_ids: list[int], projection: Projection
+) -> dict[int, ServerFragment]:
+    """使用共享的版本标识获取片段"""
+    async with _build_lock(projection):
+        if missing := [
+            server_id for server_id in server_ids if server_id not in _tokens
+        ]:
+            _tokens.update(await get_server_tokens(missing))
+        tokens = {server_id: _tokens[server_id] for server_id in server_ids}
+        return await get_fragments(server_ids, tokens, projection)
+
+
+async def stream_updates(
+    server_ids: set[int] | None,
+    user: int | None,
+    projection: Projection,
+    scope: Callable[[], Awaitable[set[int]]] | None = None,
+) -> AsyncIterator[bytes | None]:
+    """
+    逐批产出订阅服务器的最新卡片（JSON 数组字节串），空闲时产出 None 作为心跳。
+
+    连接发送缓慢时不会积压消息：发送期间的变化合并在 pending 中，下一批只推送最新状态。
+
+    :param server_ids: 订阅的服务器，None 表示按 scope 订阅
+    :param scope: 按筛选条件订阅时返回当前范围内服务器 ID 的函数
+    """
+    # 在开始迭代时才注册，保证退出时一定会注销
+    sub = subscribe(server_ids)
+    allowed: set[int] = set()
+    scope_loaded_at = float("-inf")
+    last_push = float("-inf")
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(sub.event.wait(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+
+            # 限制推送频率，等待期间的变化合并到同一批
+            delay = last_push + PUSH_INTERVAL - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            server_ids = sub.drain()
+
+            if scope is not None:
+                if time.monotonic() - scope_loaded_at > SCOPE_REFRESH_INTERVAL:
+                    allowed = await scope()
+                    scope_loaded_at = time.monotonic()
+                server_ids = [
+                    server_id for server_id in server_ids if server_id in allowed
+                ]
+            if not server_ids:
+                continue
+
+            fragments = await _get_fragments(server_ids, projection)
+            permissions = (
+                await get_user_permissions(user)
+                if "permission" in projection
+                else GUEST
+            )
+            last_push = time.monotonic()
+            yield b"".join(
+                (
+                    b"[",
+                    b",".join(
+                        render(
+                            fragments[server_id],
+                            permissions.resolve(server_id),
+                            projection,
+                        )
+                        for server_id in server_ids
+                        if server_id in fragments
+                    ),
+                    b"]",
+                )
+            )
+    finally:
+        unsubscribe(sub)
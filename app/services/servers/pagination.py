@@ -0,0 +1,54 @@
+import base64
+import binascii
+
+import ujson
+from fastapi import HTTPException, status
+from pydantic import BaseModel, Field, StrictInt, StrictStr, ValidationError
+
+
+class PositionCursor(BaseModel):
+    """按位置分页的游标：默认排序和预计算排序"""
+
+    s: str
+    seed: StrictInt | None = Field(None, ge=0)
+    pos: StrictInt = Field(ge=0)
+
+
+class KeyCursor(BaseModel):
+    """按排序键分页的游标：名称排序，key 为上一页最后一条的 (name, id)"""
+
+    s: str
+    key: tuple[StrictStr, StrictInt]
+
+
+def encode_cursor(sort: str, **data) -> str:
+    """
+    将分页位置编码为不透明的游标字符串。
+
+    :param sort: 排序方式，解码时用于校验
+    :param data: 位置数据（随机种子和位置，或上一页最后一条的排序键）
+    """
+    raw = ujson.dumps({"s": sort, **data}, ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> PositionCursor | KeyCursor:
+    """解码游标，游标无效或与排序方式不匹配时返回 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = ujson.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="cursor 无效"
+        ) from e
+    if not isinstance(data, dict) or data.get("s") != sort:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="cursor 与排序方式不匹配"
+        )
+    model = KeyCursor if sort == "name" else PositionCursor
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="cursor 无效"
+        ) from e
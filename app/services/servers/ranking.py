@@ -0,0 +1,177 @@
+import time
+
+from tortoise.signals import post_delete
+
+from app.log import logger
+from app.models import Server, ServerStatus, ServerTypeEnum
+from app.services.conn.redis import redis_client
+
+# 排序方式 -> 是否降序
+RANK_SORTS: dict[str, bool] = {
+    "players": True,  # 在线人数多的在前
+    "latency": False,  # 延迟低的在前
+    "uptime": False,  # 持续在线时间长（上线时间早）的在前
+    "newest": True,  # 新收录的在前
+}
+# 离线服务器在 latency / uptime 排序中的分数，保证排在最后
+OFFLINE_SCORE = 1e18
+
+RANK_KEY_PREFIX = "servers:rank"
+# 服务器本次连续在线的开始时间（hash: server_id -> timestamp）
+ONLINE_SINCE_KEY = "servers:online_since"
+
+
+def rank_key(sort: str, scope: str) -> str:
+    return f"{RANK_KEY_PREFIX}:{sort}:{scope}"
+
+
+def rank_scope(is_member: bool, server_type: ServerTypeEnum | str | None) -> str:
+    """根据筛选条件确定使用的排序集合范围"""
+    if isinstance(server_type, ServerTypeEnum):
+        server_type = server_type.value
+    scope = "member" if is_member else "all"
+    if server_type:
+        scope = (
+            f"type:{server_type}" if scope == "all" else f"member:type:{server_type}"
+        )
+    return scope
+
+
+def _server_scopes(is_member: bool, server_type: ServerTypeEnum | str) -> list[str]:
+    """服务器所属的全部排序集合范围"""
+    scopes = [rank_scope(False, None), rank_scope(False, server_type)]
+    if is_member:
+        scopes += [rank_scope(True, None), rank_scope(True, server_type)]
+    return scopes
+
+
+def _scores(
+    server_id: int, stat_data: dict | None, online_since: float | None
+) -> dict[str, float]:
+    online = bool(stat_data)
+    return {
+        "players": stat_data["players"]["online"] if online else -1,
+        "latency": stat_data["delay"] if online else OFFLINE_SCORE,
+        "uptime": online_since if online and online_since else OFFLINE_SCORE,
+        "newest": server_id,
+    }
+
+
+async def update_server_rank(
+    server_id: int,
+    is_member: bool,
+    server_type: ServerTypeEnum | str,
+    stat_data: dict | None,
+) -> float | None:
+    """
+    根据最新状态更新服务器在各排序集合中的分数。
+
+    :return: 服务器本次连续在线的开始时间，离线时为 None
+    """
+    if stat_data:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hsetnx(ONLINE_SINCE_KEY, str(server_id), time.time())
+            pipe.hget(ONLINE_SINCE_KEY, str(server_id))
+            _, online_since = await pipe.execute()
+    else:
+        await redis_client.hdel(ONLINE_SINCE_KEY, str(server_id))
+        online_since = None
+
+    scores = _scores(server_id, stat_data, float(online_since or 0))
+    all_scopes = _server_scopes(True, server_type)
+    scopes = _server_scopes(is_member, server_type)
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for sort, score in scores.items():
+            # 先从全部可能的集合中移除，处理成员 / 类型变化
+            for scope in all_scopes:
+                if scope not in scopes:
+                    pipe.zrem(rank_key(sort, scope), server_id)
+            for scope in scopes:
+                pipe.zadd(rank_key(sort, scope), {str(server_id): score})
+        await pipe.execute()
+    return float(online_since) if online_since else None
+
+
+async def remove_server_rank(server_id: int) -> None:
+    """从全部排序集合中移除服务器"""
+    scopes = {
+        scope
+        for server_type in ServerTypeEnum
+        for scope in _server_scopes(True, server_type)
+    }
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for sort in RANK_SORTS:
+            for scope in scopes:
+                pipe.zrem(rank_key(sort, scope), str(server_id))
+        pipe.hdel(ONLINE_SINCE_KEY, str(server_id))
+        await pipe.execute()
+
+
+@post_delete(Server)
+async def _on_server_deleted(sender, instance: Server, *args) -> None:
+    await remove_server_rank(instance.id)
+
+
+async def rebuild_rankings() -> None:
+    """根据数据库中的服务器和最新状态重建全部排序集合"""
+    servers = await Server.all().values_list("id", "is_member", "type")
+    status_map: dict[int, dict | None] = {}
+    for server_id, stat_data in (
+        await ServerStatus.all()
+        .order_by("-timestamp")
+        .values_list("server_id", "stat_data")
+    ):
+        status_map.setdefault(server_id, stat_data)
+
+    online_since = await redis_client.hgetall(ONLINE_SINCE_KEY)
+    now = time.time()
+
+    stale_keys = [key async for key in redis_client.scan_iter(f"{RANK_KEY_PREFIX}:*")]
+    async with redis_client.pipeline(transaction=True) as pipe:
+        if stale_keys:
+            pipe.delete(*stale_keys)
+        pipe.delete(ONLINE_SINCE_KEY)
+        for server_id, is_member, server_type in servers:
+            stat_data = status_map.get(server_id)
+            since = float(online_since.get(str(server_id), now))
+            if stat_data:
+                pipe.hset(ONLINE_SINCE_KEY, str(server_id), since)
+            for sort, score in _scores(server_id, stat_data, since).items():
+                for scope in _server_scopes(is_member, server_type):
+                    pipe.zadd(rank_key(sort, scope), {str(server_id): score})
+        await pipe.execute()
+    logger.info(f"排序集合重建完成，共 {len(servers)} 台服务器")
+
+
+async def get_ranked_ids(
+    sort: str, scope: str, start: int = 0, stop: int = -1
+) -> tuple[list[int], int]:
+    """
+    读取排序集合中的一段服务器 ID。
+
+    :param start: 起始位置（包含）
+    :param stop: 结束位置（包含），-1 表示到末尾
+    :return: (服务器 ID 列表, 集合总数)
+    """
+    key = rank_key(sort, scope)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zrange(key, start, stop, desc=RANK_SORTS[sort])
+        pipe.zcard(key)
+        members, total = await pipe.execute()
+    return [int(member) for member in members], total
+
+
+async def server_exists(server_id: int) -> bool:
+    """根据排序集合判断服务器是否存在，不访问数据库"""
+    return (
+        await redis_client.zscore(rank_key("newest", "all"), str(server_id)) is not None
+    )
+
+
+async def get_online_ids() -> set[int]:
+    """根据在线人数排序集合获取当前在线的服务器，离线服务器的分数为 -1"""
+    members = await redis_client.zrange(
+        rank_key("players", "all"), 0, "+inf", byscore=True
+    )
+    return {int(member) for member in members}
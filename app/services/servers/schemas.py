@@ -1,3 +1,5 @@
+from typing import Literal
+
 from fastapi import File, UploadFile
 from pydantic import BaseModel, Field
 
@@ -35,7 +37,10 @@ class GetServerStatusAPI(BaseModel):
     version: str = Field(title="版本", description="服务器的软件版本")
     motd: Motd = Field(title="MOTD", description="服务器的 MOTD 信息")
     icon: str | None = Field(
-        None, title="服务器图标", description="服务器的图标，若无则为 None"
+        None, title="服务器图标", description="服务器图标的地址，若无则为 None"
+    )
+    icon_hash: str | None = Field(
+        None, title="图标哈希", description="服务器图标的内容哈希，若无则为 None"
     )
 
     class Config:
@@ -100,6 +105,40 @@ class ServerList(BaseModel):
     random_seed: int | None = Field(
         None, title="随机种子", description="本次随机的随机种子，固定分页用"
     )  # 随机种子
+    next_cursor: str | None = Field(
+        None,
+        title="下一页游标",
+        description="获取下一页时传入 cursor，没有更多时为 None",
+    )
+
+
+# 批量获取服务器
+class ServerBatch(BaseModel):
+    server_list: list[ServerDetail] = Field(
+        title="服务器列表", description="按请求顺序排列的服务器信息"
+    )
+    missing: list[int] = Field(
+        default_factory=list, title="不存在的服务器", description="未找到的服务器 ID"
+    )
+
+
+# 增量同步
+class ServerChanges(BaseModel):
+    token: str = Field(title="同步 token", description="下次请求时作为 since 传入")
+    resync: bool = Field(
+        False,
+        title="需要全量同步",
+        description="since 已超出变更日志保留范围，需要重新获取完整列表",
+    )
+    has_more: bool = Field(
+        False, title="还有更多变更", description="为 true 时应立即使用新 token 继续请求"
+    )
+    server_list: list[ServerDetail] = Field(
+        default_factory=list, title="服务器列表", description="信息或状态有变化的服务器"
+    )
+    deleted: list[int] = Field(
+        default_factory=list, title="已删除的服务器", description="已不存在的服务器 ID"
+    )
 
 
 class ServerFilter(BaseModel):
@@ -115,6 +154,33 @@ class ServerFilter(BaseModel):
     tags: list[str] | None = Field(
         None, title="服务器标签", description="服务器标签筛选"
     )
+    tag_mode: Literal["all", "any"] = Field(
+        "all",
+        title="标签匹配模式",
+        description="all 需包含全部标签，any 包含任一标签即可",
+    )
+
+
+class ServerTagFacets(BaseModel):
+    tags: dict[str, int] = Field(
+        title="标签统计", description="筛选条件下每个标签对应的服务器数量"
+    )
+
+
+class ServerFacets(BaseModel):
+    total: int = Field(title="服务器数量", description="满足筛选条件的服务器数量")
+    tags: dict[str, int] = Field(
+        title="标签统计", description="每个标签对应的服务器数量"
+    )
+    type: dict[str, int] = Field(
+        title="类型统计", description="每种服务器类型对应的服务器数量"
+    )
+    auth_mode: dict[str, int] = Field(
+        title="认证模式统计", description="每种认证模式对应的服务器数量"
+    )
+    version: dict[str, int] = Field(
+        title="版本统计", description="每个版本对应的服务器数量"
+    )
 
 
 class UpdateServerRequest(BaseModel):
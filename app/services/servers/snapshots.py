@@ -0,0 +1,96 @@
+import asyncio
+import gzip
+import hashlib
+
+from tortoise import timezone
+
+from app.file_storage.utils import delete_stale_objects, put_public_object
+from app.log import logger
+from app.models import ServerTypeEnum
+from app.services.servers.crud import GetServers
+from app.services.servers.fragments import dumps
+from app.services.servers.schemas import ServerFilter
+
+# 快照在 S3 中的目录，快照文件按内容哈希命名
+SNAPSHOT_PREFIX = "snapshots/"
+# 指向各快照最新版本的指针文件
+POINTER_KEY = f"{SNAPSHOT_PREFIX}latest.json"
+# 被替换的快照保留时间（秒），让仍在读取旧指针的客户端可以完成下载
+SNAPSHOT_RETENTION = 3600
+
+SNAPSHOT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+POINTER_CACHE_CONTROL = "public, max-age=60"
+
+# 快照名称 -> 最近一次发布的信息
+_published: dict[str, dict] = {}
+
+
+def _snapshot_filters() -> dict[str, ServerFilter]:
+    """需要发布的快照：全部服务器、成员服务器以及每种服务器类型"""
+    filters = {
+        "all": ServerFilter(is_member=False),
+        "member": ServerFilter(is_member=True),
+    }
+    for server_type in ServerTypeEnum:
+        filters[f"type-{server_type.value.lower()}"] = ServerFilter(
+            is_member=False, modes=server_type.value
+        )
+    return filters
+
+
+async def publish_snapshots() -> None:
+    """渲染各快照，内容变化时上传到 S3 并更新指针文件"""
+    changed = False
+    for name, filter in _snapshot_filters().items():
+        # 与匿名用户请求 /v1/servers?random=false 的响应结构相同
+        content = await GetServers(filter, is_random=False)
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        if _published.get(name, {}).get("hash") == digest:
+            continue
+
+        key = f"{SNAPSHOT_PREFIX}{name}.{digest}.json.gz"
+        url = await put_public_object(
+            key,
+            gzip.compress(content, mtime=0),
+            content_type="application/json",
+            cache_control=SNAPSHOT_CACHE_CONTROL,
+            content_encoding="gzip",
+        )
+        _published[name] = {
+            "url": url,
+            "key": key,
+            "hash": digest,
+            "updated_at": timezone.now().isoformat(),
+        }
+        changed = True
+
+    if not changed:
+        return
+
+    pointer = {
+        "generated_at": timezone.now().isoformat(),
+        "snapshots": {
+            name: {field: info[field] for field in ("url", "hash", "updated_at")}
+            for name, info in _published.items()
+        },
+    }
+    await put_public_object(
+        POINTER_KEY,
+        dumps(pointer),
+        content_type="application/json",
+        cache_control=POINTER_CACHE_CONTROL,
+    )
+    logger.info(f"已发布服务器目录快照: {', '.join(_published)}")
+
+    keep = {POINTER_KEY} | {info["key"] for info in _published.values()}
+    if deleted := await delete_stale_objects(SNAPSHOT_PREFIX, keep, SNAPSHOT_RETENTION):
+        logger.info(f"已删除 {deleted} 个过期的目录快照")
+
+
+async def publish_snapshots_periodically(interval: int = 300) -> None:
+    while True:
+        try:
+            await publish_snapshots()
+        except Exception as exc:
+            logger.error(f"发布服务器目录快照时出错: {exc}")
+        await asyncio.sleep(interval)
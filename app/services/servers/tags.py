@@ -0,0 +1,94 @@
+from tortoise.functions import Count
+
+from app.log import logger
+from app.models import Server, ServerTag
+
+
+def _index_tags(tags: list[str] | None) -> set[str]:
+    """
+    需要写入索引的标签。
+
+    tag 列使用二进制排序规则，区分大小写，但比较时仍忽略末尾空格，
+    只差末尾空格的标签只保留一个，避免违反唯一约束。
+    """
+    unique: dict[str, str] = {}
+    for tag in tags or []:
+        unique.setdefault(tag.rstrip(" "), tag)
+    return set(unique.values())
+
+
+async def sync_server_tags(server_id: int, tags: list[str]) -> None:
+    """使服务器的标签索引与其 tags 字段保持一致"""
+    existing = set(
+        await ServerTag.filter(server_id=server_id).values_list("tag", flat=True)
+    )
+    wanted = _index_tags(tags)
+
+    if removed := existing - wanted:
+        await ServerTag.filter(server_id=server_id, tag__in=removed).delete()
+    if added := wanted - existing:
+        await ServerTag.bulk_create(
+            [ServerTag(server_id=server_id, tag=tag) for tag in added]
+        )
+
+
+async def rebuild_tag_index() -> None:
+    """根据所有服务器的 tags 字段重建标签索引"""
+    wanted = {
+        (server_id, tag)
+        for server_id, tags in await Server.all().values_list("id", "tags")
+        for tag in _index_tags(tags)
+    }
+    existing = {
+        (server_id, tag): index_id
+        for index_id, server_id, tag in await ServerTag.all().values_list(
+            "id", "server_id", "tag"
+        )
+    }
+
+    if removed := [existing[pair] for pair in existing.keys() - wanted]:
+        await ServerTag.filter(id__in=removed).delete()
+    if added := wanted - existing.keys():
+        await ServerTag.bulk_create(
+            [ServerTag(server_id=server_id, tag=tag) for server_id, tag in added]
+        )
+    logger.info(f"标签索引重建完成，新增 {len(added)} 条，删除 {len(removed)} 条")
+
+
+async def find_servers_by_tags(tags: list[str], match_all: bool = True) -> set[int]:
+    """
+    通过标签索引查找服务器。
+
+    :param tags: 标签列表
+    :param match_all: True 时需包含全部标签（AND），False 时包含任一标签即可（OR）
+    :return: 满足条件的服务器 ID 集合
+    """
+    wanted = set(tags)
+    server_tags: dict[int, set[str]] = {}
+    for server_id, tag in await ServerTag.filter(tag__in=wanted).values_list(
+        "server_id", "tag"
+    ):
+        server_tags.setdefault(server_id, set()).add(tag)
+
+    if match_all:
+        return {
+            server_id
+            for server_id, matched in server_tags.items()
+            if len(matched) == len(wanted)
+        }
+    return set(server_tags)
+
+
+async def count_tags(server_ids: list[int] | None = None) -> dict[str, int]:
+    """
+    统计各标签的服务器数量。
+
+    :param server_ids: 只统计这些服务器，为 None 时统计全部
+    """
+    query = ServerTag.all()
+    if server_ids is not None:
+        query = query.filter(server_id__in=server_ids)
+    rows = (
+        await query.group_by("tag").annotate(count=Count("id")).values("tag", "count")
+    )
+    return {row["tag"]: row["count"] for row in rows}
@@ -1,9 +1,9 @@
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 
-from app.models import User
 from app.services.auth.auth import verify_token
 from app.services.auth.schemas import JWTData
+from app.services.user.permissions import get_user_permissions
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -19,8 +19,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> JWTData:
 
     payload: JWTData = JWTData.model_validate(token_data)
 
-    user = await User.get_or_none(username=payload.sub)
-    if user is None:
+    # 通过缓存的权限映射确认用户仍存在，不必每次请求都查询数据库
+    if (await get_user_permissions(payload.id)).username != payload.sub:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Could not validate credentials",
@@ -38,8 +38,9 @@ async def get_optional_user(request: Request) -> JWTData | None:
             if token_data is None:
                 return None
             payload: JWTData = JWTData.model_validate(token_data)
-            user = await User.get_or_none(username=payload.sub)
-            return payload if user else None
+            # 与 get_current_user 一样通过缓存确认用户仍存在
+            permissions = await get_user_permissions(payload.id)
+            return payload if permissions.username == payload.sub else None
         except Exception:
             return None
     return None
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import ujson
+from tortoise.signals import post_delete, post_save
+
+from app.models import RoleEnum, SerRoleEnum, User, UserServer
+from app.services.conn.redis import redis_client
+
+# 进程内缓存有效期（秒），其他 worker 中的失效最多延迟这么久
+LOCAL_TTL = 10
+# Redis 缓存有效期（秒）
+REDIS_TTL = 3600
+# 进程内缓存的用户数量上限，超出时淘汰最久未使用的
+MAX_LOCAL_USERS = 4096
+
+
+def _redis_key(user_id: int) -> str:
+    return f"user:permissions:{user_id}"
+
+
+class UserPermissions(NamedTuple):
+    """用户的服务器权限映射"""
+
+    is_admin: bool  # 是否为全局管理员
+    roles: dict[int, str]  # server_id -> 角色
+    fingerprint: str  # 权限内容指纹，用于 ETag
+    username: str | None  # 当前用户名，用户不存在时为 None
+
+    def resolve(self, server_id: int) -> str:
+        """确定用户对服务器的权限"""
+        if self.is_admin:
+            return SerRoleEnum.owner.value
+        return self.roles.get(server_id, "guest")
+
+
+GUEST = UserPermissions(False, {}, "", None)
+
+# 进程内缓存 user_id -> (权限, 缓存时间)
+_local: OrderedDict[int, tuple[UserPermissions, float]] = OrderedDict()
+
+
+def _build(
+    is_admin: bool, roles: dict[int, str], username: str | None
+) -> UserPermissions:
+    raw = ujson.dumps([is_admin, sorted(roles.items())])
+    fingerprint = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    return UserPermissions(is_admin, roles, fingerprint, username)
+
+
+async def _load(user_id: int) -> UserPermissions:
+    """从数据库读取用户权限"""
+    user, user_servers = await asyncio.gather(
+        User.filter(id=user_id).first().values("role", "username"),
+        UserServer.filter(user_id=user_id).values_list("server_id", "role"),
+    )
+    return _build(
+        bool(user) and user["role"] == RoleEnum.admin,
+        {server_id: SerRoleEnum(role).value for server_id, role in user_servers},
+        user["username"] if user else None,
+    )
+
+
+async def get_user_permissions(user_id: int | None) -> UserPermissions:
+    """
+    获取用户的权限映射，依次查找进程内缓存、Redis 和数据库。
+
+    :param user_id: 用户 ID，为 None 时返回游客权限
+    """
+    if not user_id:
+        return GUEST
+
+    now = time.time()
+    cached = _local.get(user_id)
+    if cached and now - cached[1] < LOCAL_TTL:
+        _local.move_to_end(user_id)
+        return cached[0]
+
+    # 升级前写入的缓存没有 username，视为未命中
+    if (raw := await redis_client.get(_redis_key(user_id))) and "username" in (
+        data := ujson.loads(raw)
+    ):
+        permissions = _build(
+            data["admin"],
+            {int(server_id): role for server_id, role in data["servers"].items()},
+            data["username"],
+        )
+    else:
+        permissions = await _load(user_id)
+        await redis_client.set(
+            _redis_key(user_id),
+            ujson.dumps(
+                {
+                    "admin": permissions.is_admin,
+                    "servers": permissions.roles,
+                    "username": permissions.username,
+                }
+            ),
+            ex=REDIS_TTL,
+        )
+
+    _local[user_id] = (permissions, now)
+    _local.move_to_end(user_id)
+    if len(_local) > MAX_LOCAL_USERS:
+        _local.popitem(last=False)
+    return permissions
+
+
+async def invalidate_user_permissions(user_id: int) -> None:
+    """使用户的权限缓存失效"""
+    _local.pop(user_id, None)
+    await redis_client.delete(_redis_key(user_id))
+
+
+# 注意：QuerySet.update / delete 等批量操作不会触发信号，需要手动调用失效
+@post_save(UserServer)
+async def _on_user_server_saved(sender, instance: UserServer, *args) -> None:
+    await invalidate_user_permissions(instance.user_id)
+
+
+@post_delete(UserServer)
+async def _on_user_server_deleted(sender, instance: UserServer, *args) -> None:
+    await invalidate_user_permissions(instance.user_id)
+
+
+@post_save(User)
+async def _on_user_saved(
+    sender, instance: User, created, using_db, update_fields
+) -> None:
+    if update_fields and not {"role", "username"} & set(update_fields):
+        return
+    await invalidate_user_permissions(instance.id)
+
+
+@post_delete(User)
+async def _on_user_deleted(sender, instance: User, *args) -> None:
+    await invalidate_user_permissions(instance.id)
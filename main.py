@@ -7,6 +7,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 
+from app.config import settings
 from app.middleware import AuthMiddleware
 from app.file_storage.cleanup import cleanup_unused_files
 from app.file_storage.sync import sync_bucket_periodically
@@ -18,9 +19,16 @@ from app.router.servers import router as serves_router
 from app.router.user import router as user_router
 from app.router.webhook import router as webhook_router
 from app.services.conn.db import disconnect, init_db
-from app.services.conn.meilisearch import init_meilisearch_index
+from app.services.conn.meilisearch import close_meilisearch, init_meilisearch_index
 from app.services.conn.redis import redis_client
+from app.services.search.analytics import flush_analytics_periodically
+from app.services.search.indexer import run_indexer
+from app.services.search.local import listen_document_changes
 from app.services.servers.get_stats import query_servers_periodically
+from app.services.servers.live import listen_server_changes
+from app.services.servers.ranking import rebuild_rankings
+from app.services.servers.snapshots import publish_snapshots_periodically
+from app.services.servers.tags import rebuild_tag_index
 
 REDIS_LOCK_KEY = "query_servers_lock"
 REDIS_LOCK_TTL = 5
@@ -71,18 +79,29 @@ async def refresh_lock():
 async def startup(app: FastAPI):
     await init_db()
     app.state.task = app.state.lock_task = None
+    # 每个 worker 都需要接收服务器变更通知，向本进程的推送连接分发
+    app.state.live_task = asyncio.create_task(listen_server_changes())
+    # 每个 worker 维护自己的进程内搜索索引
+    app.state.search_task = asyncio.create_task(listen_document_changes())
+    app.state.analytics_task = asyncio.create_task(flush_analytics_periodically())
 
     if await acquire_lock():
         logger.success(f"🔐 获取到锁，进程 {PROCESS_ID} 启动任务")
 
         # 存储任务引用
         app.state.lock_task = asyncio.create_task(refresh_lock())  # 续期任务
-        await init_meilisearch_index()
+        if settings.SEARCH_BACKEND == "meilisearch":
+            await init_meilisearch_index()
+        await rebuild_tag_index()
+        await rebuild_rankings()
         app.state.task = [
             asyncio.create_task(query_servers_periodically()),
             asyncio.create_task(sync_bucket_periodically()),
             asyncio.create_task(cleanup_unused_files()),
+            asyncio.create_task(publish_snapshots_periodically()),
         ]
+        if settings.SEARCH_BACKEND == "meilisearch":
+            app.state.task.append(asyncio.create_task(run_indexer()))
     else:
         logger.warning("⛔ 另一个进程已持有锁，不启动任务")
 
@@ -104,7 +123,26 @@ async def startup(app: FastAPI):
         except asyncio.CancelledError:
             logger.success("✅ 续期任务已取消")
 
+    app.state.live_task.cancel()
+    try:
+        await app.state.live_task
+    except asyncio.CancelledError:
+        logger.success("✅ 推送订阅已取消")
+
+    app.state.search_task.cancel()
+    try:
+        await app.state.search_task
+    except asyncio.CancelledError:
+        logger.success("✅ 搜索索引订阅已取消")
+
+    app.state.analytics_task.cancel()
+    try:
+        await app.state.analytics_task
+    except asyncio.CancelledError:
+        logger.success("✅ 搜索统计已写入")
+
     await release_lock()
+    await close_meilisearch()
     await disconnect()
 
 
@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS `server_tag` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT,
+    `tag` VARCHAR(32) NOT NULL,
+    `server_id` INT NOT NULL,
+    UNIQUE KEY `uid_server_tag_tag_3c1b9f0e` (`tag`, `server_id`),
+    CONSTRAINT `fk_server_t_server_5a7d2c41` FOREIGN KEY (`server_id`) REFERENCES `server` (`id`) ON DELETE CASCADE,
+    KEY `idx_server_tag_tag_7f3e2a19` (`tag`)
+) CHARACTER SET utf8mb4;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS `server_tag`;"""
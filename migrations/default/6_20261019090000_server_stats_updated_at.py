@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE `server_stats` ADD `updated_at` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+        ALTER TABLE `server_stats` ADD INDEX `idx_server_stat_updated_ab1c3f` (`updated_at`);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE `server_stats` DROP INDEX `idx_server_stat_updated_ab1c3f`;
+        ALTER TABLE `server_stats` DROP COLUMN `updated_at`;"""
@@ -0,0 +1,19 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE `server` ADD `created_at` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6);
+        ALTER TABLE `server` ADD INDEX `idx_server_created_5e2b7d` (`created_at`);
+        CREATE TABLE IF NOT EXISTS `server_deleted` (
+    `server_id` INT NOT NULL PRIMARY KEY,
+    `deleted_at` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    KEY `idx_server_dele_deleted_8c41a3` (`deleted_at`)
+) CHARACTER SET utf8mb4 COMMENT='已删除服务器的记录，供增量导出输出删除标记';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS `server_deleted`;
+        ALTER TABLE `server` DROP INDEX `idx_server_created_5e2b7d`;
+        ALTER TABLE `server` DROP COLUMN `created_at`;"""
@@ -0,0 +1,121 @@
+"""
+服务器状态推送接口的压力测试。
+
+建立大量 SSE 连接，并按指定频率向 Redis 发布服务器变更通知，统计连接数和每秒推送的消息数。
+测量单个 worker 的能力时，请以 `uvicorn main:app --workers 1` 启动服务。
+
+    python scripts/live_load_test.py --url http://127.0.0.1:8000 --connections 2000 \\
+        --ids 1,2,3 --publish-rate 50 --duration 60
+
+实测结果（1 个 vCPU，压测脚本、服务和 Redis 在同一台机器上，SQLite 数据库，SEARCH_BACKEND=local）：
+
+    uvicorn main:app --workers 1 --port 8000
+
+- `--connections 2000 --ids 1,2,3 --publish-rate 50 --duration 30`：2000 个连接全部建立，0 个失败；
+  稳定后约 2000 消息/秒、6000 卡片/秒，即每个连接每秒一次推送（PUSH_INTERVAL 上限），
+  全程平均 1285.7 消息/秒。
+- `--connections 5000 --ids 1,2,3 --publish-rate 50 --duration 60`：5000 个连接（MAX_CONNECTIONS）
+  约 15 秒内全部建立，0 个失败；全部建立后的 14 秒平均约 3760 消息/秒、12000 卡片/秒，
+  部分秒数为 0 说明 CPU 已饱和，全程平均（含建立连接的时间）825.1 消息/秒。
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.conn.redis import redis_client
+from app.services.servers.cache import CHANGES_CHANNEL
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.connected = 0
+        self.failed = 0
+        self.messages = 0
+        self.cards = 0
+
+
+async def open_connection(
+    client: httpx.AsyncClient, url: str, params: dict, stats: Stats
+) -> None:
+    connected = False
+    try:
+        async with client.stream("GET", url, params=params) as response:
+            if response.status_code != 200:
+                stats.failed += 1
+                return
+            connected = True
+            stats.connected += 1
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    stats.messages += 1
+                    stats.cards += line.count('"id":')
+    except httpx.HTTPError:
+        stats.failed += 1
+    finally:
+        if connected:
+            stats.connected -= 1
+
+
+async def publish_changes(server_ids: list[int], rate: float) -> None:
+    """模拟轮询器发布服务器变更通知"""
+    while True:
+        await redis_client.publish(CHANGES_CHANNEL, str(random.choice(server_ids)))
+        await asyncio.sleep(1 / rate)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="服务器状态推送压力测试")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--ids", default="1", help="订阅的服务器 ID，逗号分隔")
+    parser.add_argument(
+        "--publish-rate", type=float, default=20, help="每秒发布的变更通知数"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="测试时长（秒）")
+    args = parser.parse_args()
+
+    server_ids = [int(i) for i in args.ids.split(",")]
+    stats = Stats()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        url = f"{args.url}/v1/servers/live"
+        tasks = [
+            asyncio.create_task(open_connection(client, url, {"ids": args.ids}, stats))
+            for _ in range(args.connections)
+        ]
+        publisher = asyncio.create_task(publish_changes(server_ids, args.publish_rate))
+
+        started = time.monotonic()
+        last_messages = last_cards = 0
+        while time.monotonic() - started < args.duration:
+            await asyncio.sleep(1)
+            print(
+                f"连接 {stats.connected:>6} | 失败 {stats.failed:>4} | "
+                f"消息/秒 {stats.messages - last_messages:>7} | "
+                f"卡片/秒 {stats.cards - last_cards:>7}"
+            )
+            last_messages, last_cards = stats.messages, stats.cards
+
+        publisher.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(publisher, *tasks, return_exceptions=True)
+
+    elapsed = time.monotonic() - started
+    print(
+        f"共 {args.connections} 个连接，{stats.failed} 个失败；"
+        f"平均 {stats.messages / elapsed:.1f} 消息/秒，{stats.cards / elapsed:.1f} 卡片/秒"
+    )
+    await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+"""
+全量重建 Meilisearch 搜索索引。
+
+数据写入临时索引后与正式索引交换，重建期间搜索不受影响。重建期间修改过的服务器会重新登记，
+由运行中的服务增量同步。
+
+    python scripts/reindex_search.py --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.conn.db import disconnect, init_db
+from app.services.search.indexer import reindex_all
+
+
+async def main(batch_size: int) -> None:
+    await init_db()
+    try:
+        await reindex_all(batch_size)
+    finally:
+        await disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="全量重建搜索索引")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批写入的文档数")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,53 @@
+import gzip
+
+import brotli
+import pytest
+from fastapi import Request
+
+from app.services.response_cache import (
+    MINIMUM_SIZE,
+    CachedResponse,
+    cache_response,
+    compressed_response,
+)
+
+BODY = b'{"server_list":[' + b'{"id":1,"name":"srv"},' * 100 + b"{}]}"
+
+
+def _request(accept_encoding: str | None) -> Request:
+    headers = []
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode("latin-1")))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def cached() -> CachedResponse:
+    assert len(BODY) >= MINIMUM_SIZE
+    return cache_response("test-etag", BODY)
+
+
+def test_br_preferred(cached: CachedResponse) -> None:
+    response = compressed_response(_request("br, gzip"), cached, {"ETag": '"x"'})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert brotli.decompress(response.body) == BODY
+
+
+def test_gzip_when_br_not_accepted(cached: CachedResponse) -> None:
+    response = compressed_response(_request("gzip"), cached, {})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.body) == BODY
+
+
+def test_identity_without_accept_encoding(cached: CachedResponse) -> None:
+    response = compressed_response(_request(None), cached, {})
+    assert "Content-Encoding" not in response.headers
+    assert response.body == BODY
+
+
+def test_small_body_not_compressed() -> None:
+    small = cache_response("test-small-etag", b"{}")
+    response = compressed_response(_request("br, gzip"), small, {})
+    assert "Content-Encoding" not in response.headers
+    assert response.body == b"{}"